@@ -0,0 +1,162 @@
+import time
+import tkinter as tk
+from functools import lru_cache
+
+# One shared frame tick (~30 fps) drives every running animation
+FRAME_INTERVAL = 33
+# Number of precomputed colors between the two ends of a fade
+RAMP_STEPS = 32
+
+
+def hex_to_rgb(color):
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+@lru_cache(maxsize=64)
+def color_ramp(start, end, steps=RAMP_STEPS):
+    """Return a tuple of ``steps`` '#rrggbb' strings blending from ``start`` to ``end``.
+
+    Ramps are built once per (start, end, steps) and reused by every label,
+    so animation frames only do an index lookup instead of string work.
+    """
+    start_rgb, end_rgb = hex_to_rgb(start), hex_to_rgb(end)
+    ramp = []
+    for step in range(steps):
+        t = step / (steps - 1) if steps > 1 else 1.0
+        r, g, b = (round(a + (b - a) * t) for a, b in zip(start_rgb, end_rgb))
+        ramp.append(f'#{r:02x}{g:02x}{b:02x}')
+    return tuple(ramp)
+
+
+def ramp_color(ramp, progress):
+    """Pick the ramp entry for a progress value between 0 and 1."""
+    index = round(min(max(progress, 0.0), 1.0) * (len(ramp) - 1))
+    return ramp[index]
+
+
+class Tween:
+    """A single animation, advanced once per frame by the AnimationDriver.
+
+    ``on_frame`` is called with the progress (0..1) for timed tweens, or with
+    the elapsed milliseconds when ``duration`` is None (runs until cancelled).
+    ``on_done`` is called once a timed tween reaches the end, but not when it
+    is cancelled or replaced.
+    """
+
+    def __init__(self, duration, on_frame, on_done=None):
+        self.duration = duration
+        self.on_frame = on_frame
+        self.on_done = on_done
+        self.started_at = None
+
+    def advance(self, now):
+        """Draw the frame for ``now``; returns False once the tween has finished."""
+        if self.started_at is None:
+            self.started_at = now
+        elapsed = (now - self.started_at) * 1000
+
+        if self.duration is None:
+            self.on_frame(elapsed)
+            return True
+
+        progress = 1.0 if self.duration <= 0 else min(elapsed / self.duration, 1.0)
+        self.on_frame(progress)
+        return progress < 1.0
+
+
+class AnimationDriver:
+    """Advance every active tween from a single after() callback.
+
+    Tweens are keyed by (widget, channel): starting a new tween on the same
+    widget and channel (e.g. a fade_out while a fade_in is running) replaces
+    the old one instead of letting both fight over the widget. When nothing
+    is animating the driver schedules no callbacks at all.
+    """
+
+    def __init__(self, root, interval=FRAME_INTERVAL, clock=time.perf_counter):
+        self.root = root
+        self.interval = interval
+        self.clock = clock
+        self._tweens = {}
+        self._after_id = None
+        self.frames = 0
+        self.frame_time = 0.0
+        self.max_frame_time = 0.0
+
+    @classmethod
+    def for_widget(cls, widget):
+        """Get the driver shared by every widget in the same Tk root."""
+        root = widget._root()
+        driver = getattr(root, '_animation_driver', None)
+        if driver is None:
+            driver = cls(root)
+            root._animation_driver = driver
+        return driver
+
+    def start(self, widget, channel, tween):
+        """Start a tween, replacing any tween already running on (widget, channel)."""
+        key = (str(widget), channel)
+        self._tweens[key] = tween
+        # Draw the first frame right away, like the old per-widget loops did
+        self._advance(key, tween, self.clock())
+        self._schedule()
+        return tween
+
+    def cancel(self, widget, channel):
+        self._tweens.pop((str(widget), channel), None)
+
+    def is_active(self, widget, channel):
+        return (str(widget), channel) in self._tweens
+
+    @property
+    def active(self):
+        return len(self._tweens)
+
+    @property
+    def idle(self):
+        return self._after_id is None
+
+    def _advance(self, key, tween, now):
+        try:
+            running = tween.advance(now)
+        except tk.TclError:
+            # The widget was destroyed mid-animation
+            self._tweens.pop(key, None)
+            return
+
+        if not running and self._tweens.get(key) is tween:
+            del self._tweens[key]
+            if tween.on_done is not None:
+                tween.on_done()
+
+    def _schedule(self):
+        if self._after_id is None and self._tweens:
+            self._after_id = self.root.after(self.interval, self._tick)
+
+    def stats(self):
+        """Per-frame cost metrics, with times in milliseconds."""
+        ramps = color_ramp.cache_info()
+        return {
+            'active': len(self._tweens),
+            'frames': self.frames,
+            'avg_frame_ms': self.frame_time / self.frames * 1000 if self.frames else 0.0,
+            'max_frame_ms': self.max_frame_time * 1000,
+            'ramps_cached': ramps.currsize,
+            'ramp_hits': ramps.hits,
+            'ramp_misses': ramps.misses
+        }
+
+    def _tick(self):
+        self._after_id = None
+        now = self.clock()
+        for key, tween in list(self._tweens.items()):
+            # Skip tweens replaced or cancelled by an earlier callback this frame
+            if self._tweens.get(key) is tween:
+                self._advance(key, tween, now)
+
+        elapsed = self.clock() - now
+        self.frames += 1
+        self.frame_time += elapsed
+        self.max_frame_time = max(self.max_frame_time, elapsed)
+        self._schedule()
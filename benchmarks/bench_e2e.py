@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""End-to-end latency of the app's lookup paths against a local stub server.
+
+Starts stub_server.StubServer, points the app at it and drives:
+
+- weather.get_weather (full forecast and current-only),
+- the CLI main() through click's test runner,
+- the GUI fetch path (WeatherApp.fetch_weather, without a window).
+
+Requests pick from a pool of --locations places, so repeats are served from
+the caches just as they would be in real use; --cold clears the in-memory
+caches before every request. The disk caches live in a temporary folder.
+
+Usage: python benchmarks/bench_e2e.py [--requests 200] [--latency 80] [--errors 0.02]
+"""
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_path(fn, args, concurrency, before=None):
+    """Call fn(arg) for every arg; returns (latencies, errors, wall time)."""
+    def timed(arg):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        try:
+            fn(arg)
+        except Exception:
+            return time.perf_counter() - start, False
+        return time.perf_counter() - start, True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, args))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(elapsed for elapsed, ok in results if ok)
+    return latencies, len(results) - len(latencies), wall
+
+
+@click.command()
+@click.option('--requests', 'count', type=click.IntRange(min=1), default=200, show_default=True,
+              help='Lookups per path')
+@click.option('--locations', type=click.IntRange(min=1), default=50, show_default=True,
+              help='Distinct places the lookups are drawn from')
+@click.option('--concurrency', '-j', type=click.IntRange(min=1), default=8, show_default=True,
+              help='Lookups in flight at once (the CLI path always runs one at a time)')
+@click.option('--latency', type=float, default=50, show_default=True, help='Stub base latency in ms')
+@click.option('--jitter', type=float, default=20, show_default=True, help='Stub extra random latency in ms')
+@click.option('--errors', type=click.FloatRange(0, 1), default=0.0, show_default=True,
+              help='Fraction of stub responses that are 503s')
+@click.option('--throttle', type=click.IntRange(min=0), default=0, show_default=True,
+              help='Stub answers 429 beyond this many requests per second')
+@click.option('--rate-limit', type=float, default=0, show_default=True,
+              help="The app's own requests-per-second limit for the stub (0 for none)")
+@click.option('--tail', type=click.FloatRange(0, 1), default=0.0, show_default=True,
+              help='Fraction of stub responses delayed by --tail-latency')
+@click.option('--tail-latency', type=float, default=1000, show_default=True, help='Extra stub latency in ms')
+@click.option('--deadline', type=float, default=8, show_default=True,
+              help='Latency budget in seconds for a GUI lookup')
+@click.option('--cold', is_flag=True, help='Clear the in-memory caches before every lookup')
+@click.option('--seed', type=int, default=0, show_default=True)
+def main(count, locations, concurrency, latency, jitter, errors, throttle, rate_limit, tail, tail_latency,
+         deadline, cold, seed):
+    """Report p50/p95/p99 latency and throughput for each lookup path."""
+    server = StubServer(
+        latency=latency / 1000, jitter=jitter / 1000, error_rate=errors, rate_limit=throttle, seed=seed,
+        tail=tail, tail_latency=tail_latency / 1000
+    ).start()
+    scratch = tempfile.mkdtemp(prefix='weather-bench-')
+    os.environ.update(server.env())
+    # Both services share the stub's address, so one limit covers them
+    os.environ['TOMORROW_RATE_LIMIT'] = os.environ['NOMINATIM_RATE_LIMIT'] = str(rate_limit)
+    os.environ['TOMORROW_RATE_BURST'] = str(max(int(rate_limit), 1))
+    os.environ['GEOCODE_CACHE_PATH'] = os.path.join(scratch, 'geocode_cache.json')
+    os.environ['LAST_KNOWN_PATH'] = os.path.join(scratch, 'last_known.json')
+    os.environ['LOOKUP_DEADLINE'] = str(deadline)
+
+    # Imported only now, since the app reads its configuration at import time
+    from click.testing import CliRunner
+    import weather
+    import weather_api
+    from weather_gui_animated import WeatherApp
+
+    def clear_caches():
+        weather_api.forecast_cache.clear()
+        weather_api.current_cache.clear()
+
+    rng = random.Random(seed)
+    coordinates = [f"{rng.uniform(-60, 60):.4f},{rng.uniform(-180, 180):.4f}" for _ in range(locations)]
+    places = [f"Benchville {index}" for index in range(locations)]
+    runner = CliRunner()
+    # The fetch path doesn't touch any widgets, so no window (or display) is needed
+    gui = object.__new__(WeatherApp)
+
+    def cli(location):
+        # '--' so negative latitudes aren't read as options
+        result = runner.invoke(weather.main, ['--', location])
+        if result.exit_code or 'Error' in result.output:
+            raise RuntimeError(result.output)
+
+    paths = [
+        ('get_weather', lambda location: weather.get_weather(location), coordinates, concurrency),
+        ('get_weather current_only', lambda location: weather.get_weather(location, current_only=True),
+         coordinates, concurrency),
+        ('cli main', cli, coordinates, 1),
+        ('gui fetch_weather', gui.fetch_weather, places, concurrency)
+    ]
+
+    click.echo(f"stub: {latency:.0f}±{jitter:.0f} ms, {errors:.0%} errors, "
+               f"{count} lookups over {locations} places, {'cold' if cold else 'warm'} caches")
+    click.echo(f"{'path':<26}{'ok':>6}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'req/s':>9}")
+    for name, fn, pool, workers in paths:
+        clear_caches()
+        args = [rng.choice(pool) for _ in range(count)]
+        latencies, failed, wall = run_path(fn, args, workers, clear_caches if cold else None)
+        p50, p95, p99 = (percentile(latencies, q) * 1e3 for q in (50, 95, 99))
+        click.echo(
+            f"{name:<26}{len(latencies):>6}{failed:>8}{p50:>7.1f} ms{p95:>7.1f} ms{p99:>7.1f} ms"
+            f"{count / wall:>9.1f}"
+        )
+
+    click.echo(f"stub served {server.requests} requests, {server.throttled} answered 429")
+    for host, stats in weather_api.rate_limiter.stats().items():
+        click.echo(f"rate limit {host}: {stats['throttled']} backoffs, "
+                   f"avg queue wait {stats['avg_wait'] * 1e3:.1f} ms, max {stats['max_wait'] * 1e3:.1f} ms")
+    for name, hedger in (('geocode', weather_api.geocode_hedger), ('forecast', weather_api.forecast_hedger)):
+        stats = hedger.stats()
+        if stats['calls']:
+            click.echo(f"hedging {name}: {stats['hedged']} of {stats['calls']} hedged, "
+                       f"{stats['hedge_wins']} won by the duplicate, {stats['deadline_misses']} past the deadline")
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
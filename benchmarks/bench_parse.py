@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Compare full response.json() parsing with selective extraction.
+
+Usage: python benchmarks/bench_parse.py [--repeat 200]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_select import extract, extract_stream
+from payloads import load_payloads
+
+CURRENT_PATH = ('timelines', 'minutely', 0, 'values')
+CHUNK_SIZE = 16 * 1024
+
+
+def full_parse(raw):
+    return json.loads(raw)['timelines']['minutely'][0]['values']
+
+
+def selective_parse(raw):
+    return extract(raw, CURRENT_PATH)
+
+
+def streaming_parse(raw):
+    chunks = (raw[i:i + CHUNK_SIZE] for i in range(0, len(raw), CHUNK_SIZE))
+    return extract_stream(chunks, CURRENT_PATH)
+
+
+METHODS = [
+    ('response.json()', full_parse),
+    ('extract', selective_parse),
+    ('extract_stream', streaming_parse)
+]
+
+
+def measure(fn, raw, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(raw)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn(raw)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+@click.command()
+@click.option('--repeat', type=click.IntRange(min=1), default=200, show_default=True)
+def main(repeat):
+    """Benchmark parse time and peak memory per forecast response."""
+    for name, raw in load_payloads():
+        expected = full_parse(raw)
+        click.echo(f"\n{name} ({len(raw) / 1024:.0f} KiB)")
+        click.echo(f"{'method':<18}{'time/resp':>12}{'peak mem':>12}")
+        for label, fn in METHODS:
+            assert fn(raw) == expected, label
+            elapsed, peak = measure(fn, raw, repeat)
+            click.echo(f"{label:<18}{elapsed * 1e3:>9.3f} ms{peak / 1024:>9.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
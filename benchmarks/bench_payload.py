@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Bytes on the wire and body decode time per forecast request.
+
+Fetches forecasts from a local stub_server.StubServer the way the app used
+to (every timeline, uncompressed) and the way it does now (only the
+timesteps each caller needs, gzipped), with the caches cleared before every
+request.
+
+Usage: python benchmarks/bench_payload.py [--requests 50]
+"""
+import os
+import random
+import sys
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer
+
+
+@click.command()
+@click.option('--requests', 'count', type=click.IntRange(min=1), default=50, show_default=True,
+              help='Requests per variant')
+@click.option('--seed', type=int, default=0, show_default=True)
+def main(count, seed):
+    """Report average wire KiB and decode time for each kind of forecast request."""
+    server = StubServer(latency=0, jitter=0).start()
+    os.environ.update(server.env())
+    os.environ['TOMORROW_RATE_LIMIT'] = '0'
+
+    # Imported only now, since the app reads its configuration at import time
+    import timings
+    import weather_api
+    from weather import OUTLOOK_TIMESTEPS
+    from weather_api import CURRENT_TIMESTEPS, HOURLY_TIMESTEPS, fetch_current, fetch_forecast
+
+    session = weather_api.get_session()
+    compressed = session.headers['Accept-Encoding']
+
+    variants = [
+        ('all timelines, identity', None, 'identity'),
+        ('all timelines, gzip', None, compressed),
+        (f'timesteps={OUTLOOK_TIMESTEPS} (outlook)', OUTLOOK_TIMESTEPS, compressed),
+        (f'timesteps={HOURLY_TIMESTEPS} (hourly)', HOURLY_TIMESTEPS, compressed),
+        (f'timesteps={CURRENT_TIMESTEPS} (current)', CURRENT_TIMESTEPS, compressed),
+        ('fetch_current (streamed)', 'current', compressed)
+    ]
+
+    rng = random.Random(seed)
+    coordinates = [(round(rng.uniform(-60, 60), 4), round(rng.uniform(-180, 180), 4)) for _ in range(count)]
+
+    click.echo(f"{count} requests per variant")
+    click.echo(f"{'request':<36}{'wire':>12}{'decode':>12}")
+    baseline = None
+    for name, timesteps, encoding in variants:
+        session.headers['Accept-Encoding'] = encoding
+        wire = decode = 0.0
+        for lat, lon in coordinates:
+            weather_api.forecast_cache.clear()
+            weather_api.current_cache.clear()
+            with timings.trace() as trace:
+                if timesteps == 'current':
+                    fetch_current(lat, lon)
+                else:
+                    fetch_forecast(lat, lon, timesteps)
+            wire += trace.sizes['response']
+            decode += trace.phases()['body']
+        wire, decode = wire / count / 1024, decode / count * 1000
+        baseline = baseline or wire
+        click.echo(f"{name:<36}{wire:>8.1f} KiB{decode:>9.2f} ms   ({wire / baseline:.0%} of the bytes)")
+
+    session.headers['Accept-Encoding'] = compressed
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Measure startup: time to the first CLI output and to the first GUI window.
+
+Every entry point is launched as a fresh interpreter and timed until its
+first line of output. GUIs run under a probe that replaces mainloop() with
+a single update(), so they report once their first frame is drawn and then
+exit (this needs a display; GUIs are skipped without one).
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--imports 10]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUI_PROBE = '''
+import runpy, sys, tkinter
+def mainloop(self, n=0):
+    self.update()
+    print("window shown", flush=True)
+    self.destroy()
+tkinter.Misc.mainloop = mainloop
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+'''
+
+# (name, module imported at startup, interpreter arguments)
+ENTRY_POINTS = [
+    ('weather.py --help', 'weather', ['weather.py', '--help']),
+    ('weather_gui.py', 'weather_gui', ['-c', GUI_PROBE, 'weather_gui.py']),
+    ('weather_gui_enhanced.py', 'weather_gui_enhanced', ['-c', GUI_PROBE, 'weather_gui_enhanced.py']),
+    ('weather_gui_animated.py', 'weather_gui_animated', ['-c', GUI_PROBE, 'weather_gui_animated.py'])
+]
+
+
+def time_to_first_output(args):
+    """Seconds until the process prints its first line, or (None, error text)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable] + args, cwd=ROOT,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    line = proc.stdout.readline()
+    elapsed = time.perf_counter() - start
+    _, stderr = proc.communicate()
+    if not line:
+        lines = stderr.strip().splitlines()
+        return None, lines[-1] if lines else f"exit code {proc.returncode}"
+    return elapsed, None
+
+
+def slowest_imports(module, count):
+    """The ``count`` imports with the largest cumulative time, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+@click.command()
+@click.option('--repeat', type=click.IntRange(min=1), default=5, show_default=True)
+@click.option('--imports', type=click.IntRange(min=0), default=0,
+              help='Also list the N slowest imports of each entry point')
+def main(repeat, imports):
+    """Benchmark cold start of the CLI and the GUIs."""
+    click.echo(f"{'entry point':<26}{'min':>10}{'median':>10}{'max':>10}")
+    for name, module, args in ENTRY_POINTS:
+        # One untimed launch so every entry point starts with warm bytecode and disk caches
+        _, error = time_to_first_output(args)
+        if error is not None:
+            click.echo(f"{name:<26}  skipped: {error}")
+            continue
+
+        times = [elapsed for elapsed, _ in (time_to_first_output(args) for _ in range(repeat)) if elapsed]
+        click.echo(
+            f"{name:<26}{min(times) * 1e3:>7.0f} ms{statistics.median(times) * 1e3:>7.0f} ms"
+            f"{max(times) * 1e3:>7.0f} ms"
+        )
+
+        for cumulative, imported in slowest_imports(module, imports):
+            click.echo(f"    {imported:<36}{cumulative / 1e3:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
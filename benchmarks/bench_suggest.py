@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Time type-ahead suggestions per keystroke.
+
+Fills a geocode cache and search history with made-up places, then types
+random place names one character at a time and times Suggester.search()
+for every prefix. Pass a gazetteer index (see offline_geocoder.py) to
+include its matches too.
+
+Usage: python benchmarks/bench_suggest.py [--places 10000] [--gazetteer gazetteer.idx]
+"""
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SYLLABLES = ['ba', 'ber', 'ca', 'dor', 'el', 'fen', 'gra', 'ham', 'is', 'ka', 'lin', 'mo', 'nor',
+             'os', 'pol', 'ri', 'san', 'ta', 'ur', 'vil', 'wes', 'york', 'zen']
+
+
+def place_name(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+@click.command()
+@click.option('--places', type=click.IntRange(min=1), default=10000, show_default=True,
+              help='Places in the geocode cache')
+@click.option('--history', type=click.IntRange(min=0), default=100, show_default=True,
+              help='Places in the search history')
+@click.option('--names', type=click.IntRange(min=1), default=200, show_default=True,
+              help='Names typed')
+@click.option('--gazetteer', type=click.Path(exists=True, dir_okay=False), help='Offline gazetteer index')
+@click.option('--seed', type=int, default=0, show_default=True)
+def main(places, history, names, gazetteer, seed):
+    """Report index build time and per-keystroke suggestion latency."""
+    scratch = tempfile.mkdtemp(prefix='weather-bench-')
+    os.environ['GEOCODE_CACHE_PATH'] = os.path.join(scratch, 'geocode_cache.json')
+    os.environ['LAST_KNOWN_PATH'] = os.path.join(scratch, 'last_known.json')
+
+    # Imported only now, since the app reads its configuration at import time
+    from geocode_cache import GeocodeCache
+    from offline_geocoder import OfflineGeocoder
+    from suggestions import Suggester
+    from weather_cache import LastKnownStore
+
+    rng = random.Random(seed)
+    geocode_cache = GeocodeCache(os.environ['GEOCODE_CACHE_PATH'])
+    last_known = LastKnownStore(os.environ['LAST_KNOWN_PATH'], max_entries=max(history, 1))
+    known = [place_name(rng) for _ in range(places)]
+    for name in known:
+        geocode_cache.put(name, rng.uniform(-60, 60), rng.uniform(-180, 180), f"{name}, Benchland", save=False)
+    for name in rng.sample(known, min(history, len(known))):
+        last_known._entries[name.lower()] = {'address': f"{name}, Benchland", 'current': {}, 'fetched_at': rng.random()}
+
+    suggester = Suggester(geocode_cache, last_known, OfflineGeocoder(gazetteer) if gazetteer else None)
+    start = time.perf_counter()
+    suggester.search('a')
+    build = time.perf_counter() - start
+
+    latencies, shown = [], 0
+    for _ in range(names):
+        name = rng.choice(known) if rng.random() < 0.8 else place_name(rng)
+        for length in range(1, len(name) + 1):
+            start = time.perf_counter()
+            results = suggester.search(name[:length])
+            latencies.append(time.perf_counter() - start)
+            shown += len(results)
+
+    latencies.sort()
+    click.echo(f"{places} cached places, {history} in the history, {len(latencies)} keystrokes")
+    click.echo(f"index built in {build * 1e3:.1f} ms")
+    click.echo(f"per keystroke: p50 {percentile(latencies, 50) * 1e3:.3f} ms, "
+               f"p99 {percentile(latencies, 99) * 1e3:.3f} ms, max {latencies[-1] * 1e3:.3f} ms, "
+               f"{shown / len(latencies):.1f} suggestions on average")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Tomorrow.io-shaped forecast payloads for offline benchmarks.
+
+Recorded responses can be dropped into benchmarks/data/*.json and are used
+in preference to the generated ones.
+"""
+import glob
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+STEP_FIELDS = [
+    'cloudBase', 'cloudCeiling', 'cloudCover', 'dewPoint', 'freezingRainIntensity',
+    'humidity', 'precipitationProbability', 'pressureSurfaceLevel', 'rainIntensity',
+    'sleetIntensity', 'snowIntensity', 'temperature', 'temperatureApparent',
+    'uvHealthConcern', 'uvIndex', 'visibility', 'weatherCode', 'windDirection',
+    'windGust', 'windSpeed'
+]
+DAILY_FIELDS = [f"{field}{suffix}" for field in STEP_FIELDS for suffix in ('Avg', 'Max', 'Min')]
+# Daily steps also carry times of day as ISO strings
+DAILY_TIME_FIELDS = ['sunriseTime', 'sunsetTime', 'moonriseTime', 'moonsetTime']
+
+
+def _step_values(rng, fields):
+    values = {}
+    for field in fields:
+        if field.startswith(('cloudCover', 'humidity', 'precipitationProbability')):
+            values[field] = round(rng.uniform(0, 100), 2)
+        elif field.startswith(('temperature', 'dewPoint')):
+            values[field] = round(rng.uniform(-10, 35), 2)
+        elif field.startswith('weatherCode'):
+            values[field] = rng.choice([1000, 1100, 1101, 1102, 4000, 4001, 5000])
+        else:
+            values[field] = round(rng.uniform(0, 30), 2)
+    return values
+
+
+def _time_values(rng, day, fields):
+    return {
+        field: (day + timedelta(minutes=rng.randrange(24 * 60))).strftime('%Y-%m-%dT%H:%M:%SZ')
+        for field in fields
+    }
+
+
+def _timeline(rng, start, step, count, fields, time_fields=()):
+    return [
+        {
+            'time': (start + step * index).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'values': {**_step_values(rng, fields), **_time_values(rng, start + step * index, time_fields)}
+        }
+        for index in range(count)
+    ]
+
+
+def make_forecast_payload(lat=42.3478, lon=-71.0466, seed=0):
+    """Build a forecast response with the same shape and size as the real API's."""
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return {
+        'timelines': {
+            'minutely': _timeline(rng, now, timedelta(minutes=1), 60, STEP_FIELDS),
+            'hourly': _timeline(rng, now, timedelta(hours=1), 120, STEP_FIELDS),
+            'daily': _timeline(rng, now, timedelta(days=1), 6, DAILY_FIELDS, DAILY_TIME_FIELDS)
+        },
+        'location': {'lat': lat, 'lon': lon}
+    }
+
+
+def load_payloads(count=5):
+    """Return a list of (name, raw bytes) forecast payloads, recorded ones first."""
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, '*.json'))):
+        with open(path, 'rb') as f:
+            payloads.append((os.path.basename(path), f.read()))
+    if not payloads:
+        for seed in range(count):
+            raw = json.dumps(make_forecast_payload(seed=seed)).encode('utf-8')
+            payloads.append((f"generated-{seed}", raw))
+    return payloads
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Tomorrow.io forecast API and Nominatim.
+
+Serves the payloads from payloads.py (recorded ones in benchmarks/data/
+first), cut down to the requested timesteps and gzipped when the client
+accepts it, and generated Nominatim results. Latency, jitter and error rate
+are configurable, so the app can be benchmarked without network access or
+an API key.
+
+Usage: python benchmarks/stub_server.py [--port 8765] [--latency 80] [--errors 0.01]
+"""
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from payloads import load_payloads
+
+FORECAST_PATH = '/v4/weather/forecast'
+# Tomorrow.io timesteps values and the timelines they select
+TIMESTEPS = {'1m': 'minutely', '1h': 'hourly', '1d': 'daily'}
+
+
+def place_for(query):
+    """A made-up but stable (lat, lon) for a place name."""
+    digest = zlib.crc32(query.lower().encode('utf-8'))
+    return round((digest % 18000) / 100 - 90, 4), round((digest // 18000 % 36000) / 100 - 180, 4)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real services, so connection pooling can be measured
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this the body waits on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.delay()
+
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if server.over_rate_limit():
+            self.send_body(429, b'{"message": "rate limited"}', {'Retry-After': '1'})
+        elif server.should_fail():
+            self.send_body(503, b'{"message": "stub error"}')
+        elif url.path == FORECAST_PATH:
+            location, timesteps = params.get('location', ''), params.get('timesteps')
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = server.forecast_for(location, timesteps, compressed=True)
+                self.send_body(200, body, {'Content-Encoding': 'gzip'})
+            else:
+                self.send_body(200, server.forecast_for(location, timesteps))
+        elif url.path == '/search':
+            self.send_json(self.search(params.get('q', '')))
+        elif url.path == '/reverse':
+            self.send_json(self.reverse(params.get('lat', '0'), params.get('lon', '0')))
+        else:
+            self.send_body(404, b'{"message": "not found"}')
+
+    def search(self, query):
+        if 'nowhere' in query.lower():
+            return []
+        lat, lon = place_for(query)
+        return [{'lat': str(lat), 'lon': str(lon), 'display_name': f"{query.title()}, Stubland"}]
+
+    def reverse(self, lat, lon):
+        return {'lat': lat, 'lon': lon, 'display_name': f"Near {lat},{lon}, Stubland"}
+
+    def send_json(self, data):
+        self.send_body(200, json.dumps(data).encode('utf-8'))
+
+    def send_body(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.requests += 1
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server; ``latency`` and ``jitter`` are in seconds.
+
+    Each response is delayed by ``latency`` plus a uniform random amount up
+    to ``jitter``, and fails with a 503 with probability ``error_rate``. A
+    ``tail`` fraction of responses take ``tail_latency`` longer, like the
+    occasional stalled request of a real service.
+    With ``rate_limit`` set, requests beyond that many in the same second
+    get a 429 with Retry-After: 1, like a throttled API key.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.05, jitter=0.02, error_rate=0.0, rate_limit=0, seed=0,
+                 tail=0.0, tail_latency=1.0):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.tail = tail
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._window = (0, 0)
+        self.random = random.Random(seed)
+        self.payloads = [json.loads(raw) for _, raw in load_payloads()]
+        self._bodies = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def env(self):
+        """Environment variables that point the app at this server."""
+        return {
+            'TOMORROW_BASE_URL': self.base_url + FORECAST_PATH,
+            'TOMORROW_API_KEY': 'stub',
+            'NOMINATIM_URL': self.base_url
+        }
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up on a slow response (e.g. at a deadline) have closed the connection
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def delay(self):
+        with self.lock:
+            seconds = self.latency + self.random.uniform(0, self.jitter)
+            if self.random.random() < self.tail:
+                seconds += self.tail_latency
+        time.sleep(seconds)
+
+    def over_rate_limit(self):
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            second, count = self._window
+            now = int(time.time())
+            count = count + 1 if second == now else 1
+            self._window = (now, count)
+            if count > self.rate_limit:
+                self.throttled += 1
+                return True
+            return False
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def forecast_for(self, location, timesteps=None, compressed=False):
+        """The encoded forecast for a location, with only the requested timelines."""
+        index = zlib.crc32(location.encode('utf-8')) % len(self.payloads)
+        key = (index, timesteps, compressed)
+        with self.lock:
+            body = self._bodies.get(key)
+        if body is not None:
+            return body
+
+        payload = self.payloads[index]
+        if timesteps:
+            wanted = {TIMESTEPS.get(step.strip()) for step in timesteps.split(',')}
+            timelines = {name: steps for name, steps in payload['timelines'].items() if name in wanted}
+            payload = {**payload, 'timelines': timelines}
+        body = json.dumps(payload).encode('utf-8')
+        if compressed:
+            body = gzip.compress(body)
+        with self.lock:
+            self._bodies[key] = body
+        return body
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    import click
+
+    @click.command()
+    @click.option('--port', type=int, default=8765, show_default=True)
+    @click.option('--latency', type=float, default=50, show_default=True, help='Base latency in ms')
+    @click.option('--jitter', type=float, default=20, show_default=True, help='Extra random latency in ms')
+    @click.option('--errors', type=click.FloatRange(0, 1), default=0.0, show_default=True,
+                  help='Fraction of requests answered with a 503')
+    @click.option('--throttle', type=click.IntRange(min=0), default=0, show_default=True,
+                  help='Answer 429 beyond this many requests per second (0 for no limit)')
+    @click.option('--tail', type=click.FloatRange(0, 1), default=0.0, show_default=True,
+                  help='Fraction of responses delayed by --tail-latency')
+    @click.option('--tail-latency', type=float, default=1000, show_default=True, help='Extra latency in ms')
+    def main(port, latency, jitter, errors, throttle, tail, tail_latency):
+        """Serve stand-in forecast and geocoding responses until interrupted."""
+        server = StubServer(port, latency / 1000, jitter / 1000, errors, throttle,
+                            tail=tail, tail_latency=tail_latency / 1000)
+        click.echo("Point the app at this server with:")
+        for name, value in server.env().items():
+            click.echo(f"  export {name}={value}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+    main()
@@ -0,0 +1,100 @@
+from array import array
+
+# NumPy is optional and slow to import, so it is only loaded by the first classify()
+numpy = None
+_numpy_checked = False
+
+# Condition codes, in the order of LABELS
+CLEAR, PARTLY_CLOUDY, CLOUDY, RAINY, SNOWY = range(5)
+LABELS = ("Clear", "Partly cloudy", "Cloudy", "Rainy", "Snowy")
+
+# Values strictly above (or for freezing, at or below) these mark the condition
+DEFAULT_THRESHOLDS = {
+    'precipitation': 50,   # precipitationProbability %, above this it's rain or snow
+    'freezing': 0,         # temperature °C, at or below this precipitation is snow
+    'cloudy': 70,          # cloudCover %
+    'partly_cloudy': 30    # cloudCover %
+}
+
+
+def _thresholds(thresholds):
+    if thresholds is None:
+        return DEFAULT_THRESHOLDS
+    return {**DEFAULT_THRESHOLDS, **thresholds}
+
+
+def _load_numpy():
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_checked = True
+    return numpy
+
+
+def classify_one(precipitation, temperature, cloud_cover, thresholds=None):
+    """Return the condition code for a single step."""
+    limits = _thresholds(thresholds)
+    if precipitation > limits['precipitation']:
+        if temperature <= limits['freezing']:
+            return SNOWY
+        return RAINY
+    elif cloud_cover > limits['cloudy']:
+        return CLOUDY
+    elif cloud_cover > limits['partly_cloudy']:
+        return PARTLY_CLOUDY
+    else:
+        return CLEAR
+
+
+def classify(precipitation, temperature, cloud_cover, thresholds=None):
+    """Classify whole columns of precipitationProbability, temperature and cloudCover.
+
+    Accepts any equal-length sequences (lists, array('d'), NumPy arrays) and
+    returns the condition codes: a NumPy int8 array when NumPy is installed,
+    otherwise an array('b').
+    """
+    limits = _thresholds(thresholds)
+    numpy = _load_numpy()
+
+    if numpy is not None:
+        precipitation = numpy.asarray(precipitation, dtype=float)
+        temperature = numpy.asarray(temperature, dtype=float)
+        cloud_cover = numpy.asarray(cloud_cover, dtype=float)
+
+        codes = numpy.full(cloud_cover.shape, CLEAR, dtype=numpy.int8)
+        codes[cloud_cover > limits['partly_cloudy']] = PARTLY_CLOUDY
+        codes[cloud_cover > limits['cloudy']] = CLOUDY
+        wet = precipitation > limits['precipitation']
+        codes[wet] = RAINY
+        codes[wet & (temperature <= limits['freezing'])] = SNOWY
+        return codes
+
+    # Same branches as classify_one(), inlined with everything in locals to skip a call per step
+    wet, freezing = limits['precipitation'], limits['freezing']
+    cloudy, partly_cloudy = limits['cloudy'], limits['partly_cloudy']
+    snowy, rainy, cloudy_code, partly_code, clear = SNOWY, RAINY, CLOUDY, PARTLY_CLOUDY, CLEAR
+    return array('b', [
+        (snowy if t <= freezing else rainy) if p > wet
+        else cloudy_code if c > cloudy
+        else partly_code if c > partly_cloudy
+        else clear
+        for p, t, c in zip(precipitation, temperature, cloud_cover)
+    ])
+
+
+def labels(codes):
+    """Convert condition codes to their descriptions."""
+    return [LABELS[code] for code in codes]
+
+
+def classify_timeline(timeline, thresholds=None):
+    """Classify every step of a forecast_model.Timeline."""
+    return classify(
+        timeline.column('precipitationProbability'),
+        timeline.column('temperature'),
+        timeline.column('cloudCover'),
+        thresholds
+    )
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from timings import Histogram, attach, current_trace
+
+# Hedge a call after this many seconds until enough calls have been timed to know its p95
+HEDGE_DELAY = float(os.getenv('HEDGE_DELAY', '1.0'))
+HEDGE_MIN_SAMPLES = 20
+# At most this fraction of calls get a duplicate, so a struggling service isn't sent twice the load
+HEDGE_MAX_RATIO = float(os.getenv('HEDGE_MAX_RATIO', '0.1'))
+HEDGE_WORKERS = int(os.getenv('HEDGE_WORKERS', '16'))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Small bounded pool for hedged attempts and other short background network jobs."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='weather-hedge')
+    return _executor
+
+
+class DeadlineExceeded(Exception):
+    """A lookup ran out of its latency budget."""
+
+    def __init__(self, budget):
+        super().__init__(f"No response within {budget:g} s")
+        self.budget = budget
+
+
+class Deadline:
+    """A total latency budget, shared by every step of a lookup."""
+
+    def __init__(self, budget, clock=time.monotonic):
+        self.budget = budget
+        self.clock = clock
+        self.expires = clock() + budget
+
+    def remaining(self):
+        return max(self.expires - self.clock(), 0.0)
+
+    def expired(self):
+        return self.clock() >= self.expires
+
+    def timeout(self, timeout=None):
+        """Cap a requests timeout (seconds or (connect, read)) at the time left."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(self.budget)
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(min(part, remaining) for part in timeout)
+        return min(timeout, remaining)
+
+
+class Hedger:
+    """Send a duplicate of a call that is taking longer than its usual p95.
+
+    Whichever attempt succeeds first wins; the other is left to finish in
+    the background, so its result still lands in the caches. Calls are
+    timed into a histogram, and until ``min_samples`` of them have been
+    the duplicate goes out after ``delay`` seconds instead.
+
+    ``queue_hook`` (e.g. rate_limiter.on_dequeue) is a context manager
+    factory taking a callback to run when the call's request actually goes
+    out. With one, calls are timed from then rather than from the start,
+    so time spent waiting for a local rate limit slot doesn't trigger a
+    duplicate that would only join the same queue.
+    """
+
+    def __init__(self, delay=HEDGE_DELAY, percentile=0.95, min_samples=HEDGE_MIN_SAMPLES,
+                 max_ratio=HEDGE_MAX_RATIO, queue_hook=None):
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self.queue_hook = queue_hook
+        self.latency = Histogram()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_misses = 0
+
+    def hedge_after(self):
+        """Seconds a call may run before it is hedged."""
+        with self._lock:
+            if self.latency.count < self.min_samples:
+                return self.delay
+            return self.latency.quantile(self.percentile)
+
+    def call(self, deadline, fn, *args, hedge=None, timeout=None):
+        """Return fn(*args, timeout=...) before ``deadline``, or raise DeadlineExceeded.
+
+        Each attempt gets ``timeout`` capped at the time left. The duplicate
+        calls ``hedge`` (default: fn) instead, e.g. to skip a SingleFlight
+        the first attempt is waiting on.
+        """
+        lookup = current_trace()
+
+        def attempt(fn, trace, sent=None):
+            with attach(trace):
+                if sent is None or self.queue_hook is None:
+                    return fn(*args, timeout=deadline.timeout(timeout))
+
+                def on_sent():
+                    # Retries send again; the first send is what counts
+                    if not sent.done():
+                        sent.set_result(time.perf_counter())
+
+                with self.queue_hook(on_sent):
+                    return fn(*args, timeout=deadline.timeout(timeout))
+
+        with self._lock:
+            self.calls += 1
+            may_hedge = self.hedged < self.max_ratio * self.calls
+        hedge_at = self.hedge_after() if may_hedge else None
+
+        start = time.perf_counter()
+        # Resolves to the time the first attempt's request went out
+        sent = Future()
+        if self.queue_hook is None:
+            sent.set_result(start)
+        # Only the first attempt reports its phases to the caller's trace, so they aren't counted twice
+        pending = {get_executor().submit(attempt, fn, lookup, sent)}
+        duplicate = None
+        error = None
+        while True:
+            wait_for = deadline.remaining()
+            waiting = set(pending)
+            if hedge_at is not None:
+                if sent.done():
+                    wait_for = min(wait_for, max(hedge_at - (time.perf_counter() - sent.result()), 0.0))
+                else:
+                    waiting.add(sent)
+            done, _ = wait(waiting, timeout=wait_for, return_when=FIRST_COMPLETED)
+            pending -= done
+
+            for future in done:
+                if future is sent:
+                    continue
+                if future.exception() is None:
+                    with self._lock:
+                        self.latency.observe(time.perf_counter() - (sent.result() if sent.done() else start))
+                        self.hedge_wins += future is duplicate
+                    return future.result()
+                error = future.exception()
+
+            if deadline.expired():
+                with self._lock:
+                    self.deadline_misses += 1
+                raise DeadlineExceeded(deadline.budget) from error
+            if not pending:
+                raise error
+            if hedge_at is not None and sent.done() and time.perf_counter() - sent.result() >= hedge_at:
+                duplicate = get_executor().submit(attempt, hedge or fn, None)
+                pending.add(duplicate)
+                hedge_at = None
+                with self._lock:
+                    self.hedged += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'deadline_misses': self.deadline_misses,
+                'p95': self.latency.quantile(self.percentile)
+            }
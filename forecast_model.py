@@ -0,0 +1,146 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+
+def parse_time(value):
+    """Convert an ISO 8601 timestamp (or datetime) to POSIX seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class Timeline:
+    """One forecast timeline stored as typed columns.
+
+    ``timestamps`` is a sorted array of POSIX seconds and every numeric field
+    is an ``array('d')`` of the same length, with NaN where a step had no
+    value. Fields holding anything else (e.g. the daily ``sunriseTime``) are
+    kept as plain lists of the values as given, with None where missing.
+    """
+
+    def __init__(self, name, timestamps, columns):
+        self.name = name
+        self.timestamps = timestamps
+        self.columns = columns
+
+    @classmethod
+    def from_steps(cls, name, steps):
+        """Build a timeline from the API's list of ``{'time': ..., 'values': {...}}`` steps."""
+        fields = []
+        for step in steps:
+            for field in step.get('values', {}):
+                if field not in fields:
+                    fields.append(field)
+
+        timestamps = array('d')
+        raw = {field: [] for field in fields}
+        for step in steps:
+            timestamps.append(parse_time(step['time']))
+            values = step.get('values', {})
+            for field in fields:
+                raw[field].append(values.get(field))
+
+        columns = {}
+        for field, values in raw.items():
+            if all(value is None or isinstance(value, (int, float)) for value in values):
+                columns[field] = array('d', (math.nan if value is None else value for value in values))
+            else:
+                columns[field] = values
+        return cls(name, timestamps, columns)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def fields(self):
+        return list(self.columns)
+
+    def column(self, field):
+        return self.columns[field]
+
+    def slice(self, start=None, end=None, fields=None):
+        """Return a new timeline with the steps in [start, end) and only ``fields``."""
+        lo = 0 if start is None else bisect_left(self.timestamps, parse_time(start))
+        hi = len(self.timestamps) if end is None else bisect_left(self.timestamps, parse_time(end))
+        fields = self.fields if fields is None else fields
+        return Timeline(
+            self.name,
+            self.timestamps[lo:hi],
+            {field: self.columns[field][lo:hi] for field in fields}
+        )
+
+    def head(self, count):
+        return Timeline(
+            self.name,
+            self.timestamps[:count],
+            {field: column[:count] for field, column in self.columns.items()}
+        )
+
+    def index_at(self, when):
+        """Index of the last step at or before ``when`` (or the first step)."""
+        return max(bisect_right(self.timestamps, parse_time(when)) - 1, 0)
+
+    def values(self, index=0):
+        """Return one step as a ``{field: value}`` dict, skipping missing values."""
+        return {
+            field: column[index]
+            for field, column in self.columns.items()
+            if not _missing(column[index])
+        }
+
+    def rows(self):
+        """Yield (datetime, values dict) for every step."""
+        for index, timestamp in enumerate(self.timestamps):
+            yield datetime.fromtimestamp(timestamp, timezone.utc), self.values(index)
+
+
+class Forecast:
+    """Columnar view of a whole Tomorrow.io forecast payload.
+
+    Keeps the minutely, hourly and daily timelines from a single fetch so
+    the same response can serve current conditions and hourly/daily views.
+    """
+
+    def __init__(self, timelines, location=None):
+        self.timelines = timelines
+        self.location = location
+
+    @classmethod
+    def from_payload(cls, data):
+        timelines = {
+            name: Timeline.from_steps(name, steps)
+            for name, steps in data.get('timelines', {}).items()
+        }
+        return cls(timelines, data.get('location'))
+
+    def __getitem__(self, name):
+        return self.timelines[name]
+
+    def __contains__(self, name):
+        return name in self.timelines
+
+    @property
+    def minutely(self):
+        return self.timelines.get('minutely')
+
+    @property
+    def hourly(self):
+        return self.timelines.get('hourly')
+
+    @property
+    def daily(self):
+        return self.timelines.get('daily')
+
+    def current(self):
+        """Current conditions, i.e. the first minutely step."""
+        return self.minutely.values(0)
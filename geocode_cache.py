@@ -0,0 +1,114 @@
+import csv
+import os
+import re
+import threading
+
+from json_store import JSONFile
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.weather_app', 'geocode_cache.json')
+
+
+def normalize_query(query):
+    """Normalize a place name so "New York, NY" and " new york ny " share one key."""
+    query = re.sub(r'[^\w\s]', ' ', query.lower())
+    return ' '.join(query.split())
+
+
+class GeocodeCache:
+    """Disk-backed cache of geocoding results that survives restarts.
+
+    Entries are stored as ``{normalized query: [lat, lon, address]}`` in a
+    JSON file, which is rewritten atomically whenever a new place is added.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = JSONFile(path)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        self._entries = self._file.load({})
+
+    def save(self):
+        with self._lock:
+            entries = dict(self._entries)
+        self._file.save(entries)
+
+    def get(self, query):
+        """Return (lat, lon, address) for a query, or None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(normalize_query(query))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return tuple(entry)
+
+    def put(self, query, lat, lon, address, save=True):
+        with self._lock:
+            self._entries[normalize_query(query)] = [lat, lon, address]
+        if save:
+            self.save()
+
+    def warm(self, path):
+        """Load known places from a CSV file of ``name,lat,lon[,address]`` rows.
+
+        Returns the number of places added.
+        """
+        count = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if not row or row[0].startswith('#'):
+                    continue
+                try:
+                    name, lat, lon = row[0], float(row[1]), float(row[2])
+                except (IndexError, ValueError):
+                    continue
+                address = row[3] if len(row) > 3 and row[3] else name
+                self.put(name, lat, lon, address, save=False)
+                count += 1
+        self.save()
+        return count
+
+    def items(self):
+        """(normalized query, (lat, lon, address)) for every cached place."""
+        with self._lock:
+            return [(query, tuple(entry)) for query, entry in self._entries.items()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, query):
+        # Unlike get(), doesn't count towards the hit rate
+        with self._lock:
+            return normalize_query(query) in self._entries
+
+
+if __name__ == '__main__':
+    import click
+
+    @click.command()
+    @click.argument('places', type=click.Path(exists=True, dir_okay=False))
+    def main(places):
+        """
+        Warm the geocoding cache from a CSV file of PLACES.
+
+        Each row is name,lat,lon[,address], e.g. "Boston,42.3601,-71.0589".
+        """
+        from weather_api import geocode_cache
+        count = geocode_cache.warm(places)
+        click.echo(f"Added {count} places to {geocode_cache.path}")
+
+    main()
@@ -0,0 +1,221 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+from deadline import DeadlineExceeded
+from suggestions import suggester
+from timings import span, trace
+from weather_api import last_known, lookup_current
+from weather_cache import format_age
+
+# Small pool shared by every GUI in the process; lookups are I/O bound
+GUI_WORKERS = int(os.getenv('GUI_WORKERS', '4'))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=GUI_WORKERS, thread_name_prefix='weather-gui')
+    return _executor
+
+class LookupFailed(Exception):
+    """A lookup failed in a way the user can understand, e.g. "Location not found"."""
+
+
+def error_message(error):
+    """Turn an exception from a worker job into the text shown in the error dialog."""
+    if isinstance(error, (LookupFailed, DeadlineExceeded)):
+        return str(error)
+    # Only imported once a lookup has failed, by which point requests is loaded
+    import requests
+    if isinstance(error, requests.exceptions.RequestException):
+        return f"Error fetching weather data: {str(error)}"
+    return f"An error occurred: {str(error)}"
+
+
+class GuiWorker:
+    """Run blocking lookups off the Tk thread, delivering only the latest result.
+
+    Every submit() on a channel (e.g. 'weather') gets a new generation number.
+    When a job finishes its callback is posted back to the Tk thread, and it
+    is dropped there if a newer job has been submitted on the same channel
+    since. A superseded job that hasn't started yet is cancelled outright.
+    """
+
+    def __init__(self, root, on_in_flight_change=None):
+        self.root = root
+        self.on_in_flight_change = on_in_flight_change
+        self.in_flight = 0
+        self.dropped = 0
+        self._generations = {}
+        self._futures = {}
+
+    def submit(self, channel, fn, *args, on_success, on_error):
+        """Run fn(*args) on the pool and call on_success(result) or on_error(exception)."""
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+
+        previous = self._futures.get(channel)
+        if previous is not None:
+            previous.cancel()
+
+        self.in_flight += 1
+        self._notify()
+
+        future = get_executor().submit(fn, *args)
+        self._futures[channel] = future
+        future.add_done_callback(
+            lambda f: self.root.after(0, self._deliver, channel, generation, f, on_success, on_error)
+        )
+        return generation
+
+    def cancel(self, channel):
+        """Drop the latest job's result on a channel, cancelling the job if it hasn't started."""
+        if channel not in self._generations:
+            return
+        self._generations[channel] += 1
+        future = self._futures.pop(channel, None)
+        if future is not None:
+            future.cancel()
+
+    def is_current(self, channel, generation):
+        return self._generations.get(channel) == generation
+
+    def _deliver(self, channel, generation, future, on_success, on_error):
+        # Runs on the Tk thread
+        self.in_flight -= 1
+        self._notify()
+
+        if not self.is_current(channel, generation):
+            self.dropped += 1
+            return
+        self._futures.pop(channel, None)
+
+        error = future.exception()
+        if error is not None:
+            on_error(error)
+        else:
+            on_success(future.result())
+
+    def _notify(self):
+        if self.on_in_flight_change is not None:
+            self.on_in_flight_change(self.in_flight)
+
+
+class WeatherLookup:
+    """Searching, revalidating and status lines shared by the weather GUIs.
+
+    The GUI sets up root, location_entry, worker, age_var, timings_var and
+    in_flight_var, and implements show_weather(current, address, fetched_at).
+    lookup_started(refreshing) and lookup_finished() can be overridden to
+    drive a loading indicator.
+    """
+
+    fetched_at = None
+    age_after_id = None
+    window_visible = True
+
+    def watch_visibility(self):
+        """Pause timers while the window is minimized."""
+        self.root.bind('<Map>', self.on_map, add='+')
+        self.root.bind('<Unmap>', self.on_unmap, add='+')
+
+    def on_map(self, event):
+        # Bindings on the root also fire for every child widget
+        if event.widget is self.root:
+            self.window_visible = True
+            self.update_age_label()
+
+    def on_unmap(self, event):
+        if event.widget is self.root:
+            self.window_visible = False
+            self.stop_age_label()
+
+    def pick_suggestion(self, location, place):
+        self.get_weather(place)
+
+    def get_weather(self, place=None):
+        """Get weather data and update the UI; ``place`` is (lat, lon, address) if already known."""
+        location = self.location_entry.get().strip()
+        if not location:
+            messagebox.showwarning("Warning", "Please enter a location")
+            return
+
+        # Show the last known result for this place right away, then revalidate it
+        cached = last_known.get(location)
+        if cached is not None:
+            address, current, fetched_at = cached
+            self.show_weather(current, address, fetched_at)
+        else:
+            self.fetched_at = None
+        self.lookup_started(cached is not None)
+
+        # Runs in the background; older searches still in flight are dropped
+        self.worker.submit(
+            'weather', self.fetch_weather, location, place,
+            on_success=self.handle_weather_success,
+            on_error=self.handle_weather_error
+        )
+
+    def fetch_weather(self, location, place=None):
+        """Geocode a location and fetch its current conditions (runs on a worker thread)."""
+        # Imported here rather than at startup; geopy is slow to import
+        from geopy.exc import GeocoderTimedOut
+        with trace() as lookup, span('lookup'):
+            try:
+                # Served from the caches for repeat lookups; gives up after LOOKUP_DEADLINE
+                result = lookup_current(location, place=place)
+            except GeocoderTimedOut:
+                raise LookupFailed("Geocoding service timed out. Please try again.")
+            if result is None:
+                raise LookupFailed("Location not found")
+        return result, lookup
+
+    def handle_weather_success(self, result):
+        (address, current, fetched_at, stale), lookup = result
+        self.lookup_finished()
+        with lookup.span('ui'):
+            self.show_weather(current, address, fetched_at)
+        if stale:
+            self.age_var.set(f"{self.age_var.get()} (timed out)")
+        self.timings_var.set(lookup.summary())
+        # The search may have taught the caches a new place to suggest
+        get_executor().submit(suggester.refresh)
+
+    def handle_weather_error(self, error):
+        self.lookup_finished()
+        if self.fetched_at is not None:
+            # Keep showing the cached result rather than interrupting with a dialog
+            self.update_age_label()
+            self.age_var.set(f"{self.age_var.get()} (refresh failed: {error_message(error)})")
+            return
+        messagebox.showerror("Error", error_message(error))
+
+    def lookup_started(self, refreshing):
+        pass
+
+    def lookup_finished(self):
+        pass
+
+    def update_age_label(self):
+        self.stop_age_label()
+        if self.fetched_at is None:
+            self.age_var.set("")
+            return
+        self.age_var.set(f"Updated {format_age(last_known.age(self.fetched_at))}")
+        # Nobody sees the label while minimized; on_map brings it up to date
+        if self.window_visible:
+            self.age_after_id = self.root.after(30000, self.update_age_label)
+
+    def stop_age_label(self):
+        if self.age_after_id is not None:
+            self.root.after_cancel(self.age_after_id)
+            self.age_after_id = None
+
+    def update_in_flight(self, count):
+        self.in_flight_var.set(f"{count} request{'s' if count != 1 else ''} in flight" if count else "")
@@ -0,0 +1,126 @@
+import os
+import threading
+from dotenv import load_dotenv
+from timings import span
+from rate_limiter import rate_limiter, limit_session
+
+# Load environment variables
+load_dotenv()
+
+# (connect, read) timeouts in seconds, so a request can never hang forever
+REQUEST_TIMEOUT = (
+    float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+    float(os.getenv('HTTP_READ_TIMEOUT', '15'))
+)
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '3'))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.5'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))
+# Ask for compressed responses (gzip/deflate, plus br/zstd when their decoders are installed)
+HTTP_COMPRESSION = os.getenv('HTTP_COMPRESSION', '1').lower() not in ('0', 'false', 'no')
+
+# Transient upstream failures worth retrying
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+def create_session(retries=HTTP_RETRIES, backoff=HTTP_BACKOFF, pool_size=HTTP_POOL_SIZE):
+    """Create a requests session with connection pooling and bounded retries.
+
+    Idempotent GET requests are retried on connection errors and 5xx
+    responses, waiting backoff * 2**n seconds between attempts. Responses
+    are compressed unless HTTP_COMPRESSION is off; requests already sends
+    every Accept-Encoding that urllib3 can decode.
+    """
+    # requests takes a while to import, so it isn't loaded until the first lookup
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    adapter.poolmanager.pool_classes_by_scheme = _timed_pool_classes()
+
+    session = requests.Session()
+    if not HTTP_COMPRESSION:
+        session.headers['Accept-Encoding'] = 'identity'
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # Queue requests behind each host's rate limit, and retry 429s once it allows
+    limit_session(session, rate_limiter)
+    return session
+
+def _timed_pool_classes():
+    """urllib3 pool classes whose new connections record a 'connect' span (DNS, TCP and TLS)."""
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            with span('connect'):
+                super().connect()
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            with span('connect'):
+                super().connect()
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+def preconnect(url):
+    """Open a kept-alive connection to url's host ahead of a request to it.
+
+    Nothing is sent, so this doesn't count against the service's rate
+    limit, and nothing happens if the pool already has an idle connection.
+    This borrows a connection through urllib3's private _get_conn() and
+    _put_conn(), which is why requirements.txt pins urllib3's major version.
+    """
+    import requests
+
+    session = get_session()
+    adapter = session.get_adapter(url)
+    # The pools belong to the transport adapter inside the RateLimitedAdapter
+    adapter = getattr(adapter, 'adapter', adapter)
+    if hasattr(adapter, 'get_connection_with_tls_context'):
+        pool = adapter.get_connection_with_tls_context(requests.Request('GET', url).prepare(), session.verify)
+    else:
+        pool = adapter.get_connection(url)
+        adapter.cert_verify(pool, url, session.verify, None)
+
+    conn = pool._get_conn()
+    try:
+        if conn.sock is None:
+            conn.timeout = REQUEST_TIMEOUT[0]
+            conn.connect()
+    finally:
+        pool._put_conn(conn)
+
+def get_session():
+    """Get the process-wide session, so every lookup reuses kept-alive connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Includes importing requests, so the first lookup's cost shows up
+                with span('setup'):
+                    _session = create_session()
+    return _session
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,172 @@
+import codecs
+import json
+import re
+
+# Selective JSON extraction: walk a JSON document along a path such as
+# ('timelines', 'minutely', 0, 'values') and decode only the value found
+# there. Everything that is not on the path is skipped with regexes instead
+# of being turned into Python objects.
+
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+_SCALAR_END = re.compile(r'[,\]}\s]')
+_decoder = json.JSONDecoder()
+
+
+class _NeedMore(Exception):
+    """Raised when the buffered text ends before the value we need."""
+
+
+def _skip_whitespace(text, pos):
+    pos = _WHITESPACE.match(text, pos).end()
+    if pos >= len(text):
+        raise _NeedMore()
+    return pos
+
+
+def _match_string(text, pos):
+    match = _STRING.match(text, pos)
+    if match is None:
+        raise _NeedMore()
+    return match
+
+
+def _skip_value(text, pos):
+    """Return the position just after the JSON value starting at ``pos``."""
+    char = text[pos]
+    if char == '"':
+        return _match_string(text, pos).end()
+
+    if char in '[{':
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                raise _NeedMore()
+            token = match.group()
+            if token == '"':
+                pos = _match_string(text, match.start()).end()
+                continue
+            depth += 1 if token in '[{' else -1
+            pos = match.end()
+            if depth == 0:
+                return pos
+
+    match = _SCALAR_END.search(text, pos)
+    if match is None:
+        raise _NeedMore()
+    return match.start()
+
+
+def _expect(text, pos, char):
+    pos = _skip_whitespace(text, pos)
+    if text[pos] != char:
+        raise ValueError(f"Expected {char!r} at position {pos}, found {text[pos]!r}")
+    return pos + 1
+
+
+def _find(text, path):
+    """Return the position of the value at ``path``, raising KeyError/IndexError if absent."""
+    pos = 0
+    for step in path:
+        if isinstance(step, str):
+            pos = _expect(text, pos, '{')
+            while True:
+                pos = _skip_whitespace(text, pos)
+                if text[pos] == '}':
+                    raise KeyError(step)
+                if text[pos] == ',':
+                    pos += 1
+                    continue
+                match = _match_string(text, pos)
+                key = json.loads(match.group())
+                pos = _skip_whitespace(text, _expect(text, match.end(), ':'))
+                if key == step:
+                    break
+                pos = _skip_value(text, pos)
+        else:
+            pos = _expect(text, pos, '[')
+            index = 0
+            while True:
+                pos = _skip_whitespace(text, pos)
+                if text[pos] == ']':
+                    raise IndexError(step)
+                if text[pos] == ',':
+                    pos += 1
+                    continue
+                if index == step:
+                    break
+                pos = _skip_value(text, pos)
+                index += 1
+    return _skip_whitespace(text, pos)
+
+
+def _decode_at(text, path, complete):
+    pos = _find(text, path)
+    try:
+        value, end = _decoder.raw_decode(text, pos)
+    except json.JSONDecodeError:
+        if complete:
+            raise
+        raise _NeedMore()
+    # A number cut off by the end of the buffer (e.g. "-0." or "2.5e-") decodes
+    # to the wrong value, so only trust one that is followed by a delimiter
+    if not complete and not isinstance(value, (dict, list, str)):
+        if end >= len(text) or not _SCALAR_END.match(text, end):
+            raise _NeedMore()
+    return value
+
+
+def _select_fields(value, fields):
+    if fields is None:
+        return value
+    return {field: value[field] for field in fields if field in value}
+
+
+def extract(text, path, fields=None):
+    """Decode only the value at ``path`` in a complete JSON document.
+
+    ``fields`` optionally limits an object result to those keys.
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+    try:
+        return _select_fields(_decode_at(text, path, True), fields)
+    except _NeedMore:
+        raise ValueError("Unexpected end of JSON document") from None
+
+
+def extract_stream(chunks, path, fields=None, encoding='utf-8'):
+    """Decode only the value at ``path`` from an iterable of byte chunks.
+
+    Chunks are consumed only until the value is complete; the rest of the
+    stream is left unread. Each retry waits until the buffer has doubled,
+    so rescanning stays linear in the amount of text read.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parts = []
+    size = 0
+    next_attempt = 0
+    chunks = iter(chunks)
+    complete = False
+
+    while True:
+        if size >= next_attempt or complete:
+            text = ''.join(parts)
+            parts = [text]
+            try:
+                return _select_fields(_decode_at(text, path, complete), fields)
+            except _NeedMore:
+                if complete:
+                    raise ValueError("Unexpected end of JSON document") from None
+                next_attempt = max(size * 2, 1)
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            parts.append(decoder.decode(b'', final=True))
+            complete = True
+        else:
+            text = decoder.decode(chunk)
+            parts.append(text)
+            size += len(text)
@@ -0,0 +1,36 @@
+import json
+import os
+import threading
+
+
+class JSONFile:
+    """A JSON document on disk that is rewritten atomically.
+
+    save() writes a temporary file next to ``path`` and renames it over the
+    old one, so a crash never leaves half a file behind. Saves are
+    serialized, since concurrent ones would otherwise share (and clobber)
+    the temporary file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self, default):
+        """Return the stored document, or ``default`` if the file is missing or unreadable."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # A missing or corrupt file is not fatal, we just start over
+            return default
+
+    def save(self, data):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,246 @@
+import math
+import mmap
+import os
+import struct
+from geocode_cache import normalize_query
+
+# Index file layout (all little-endian):
+#   header   magic + counts and section offsets
+#   places   fixed-size records, ordered as an implicit k-d tree for reverse lookups
+#   names    UTF-8 display names referenced by the place records
+#   index    (key offset, key length, place number) entries sorted by key for prefix lookups
+#   keys     UTF-8 normalized search keys referenced by the index entries
+MAGIC = b'WGAZ0001'
+HEADER = struct.Struct('<8sIIIIII')
+# lat, lon, x, y, z (unit sphere), population, name offset, name length, country code
+PLACE = struct.Struct('<ddfffIIH2s')
+INDEX_ENTRY = struct.Struct('<III')
+
+
+def _to_xyz(lat, lon):
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def read_gazetteer(path, min_population=0):
+    """Read places from a gazetteer TSV file.
+
+    Accepts GeoNames dumps (e.g. cities500.txt) as well as simple
+    ``name<TAB>lat<TAB>lon[<TAB>country[<TAB>population]]`` files. Returns a
+    list of (name, ascii name, lat, lon, country, population) tuples.
+    """
+    places = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            cols = line.rstrip('\n').split('\t')
+            try:
+                if len(cols) >= 15:
+                    # GeoNames: id, name, asciiname, alternatenames, lat, lon, ..., country (8), ..., population (14)
+                    place = (cols[1], cols[2], float(cols[4]), float(cols[5]), cols[8], int(cols[14] or 0))
+                else:
+                    country = cols[3] if len(cols) > 3 else ''
+                    population = int(cols[4]) if len(cols) > 4 and cols[4] else 0
+                    place = (cols[0], cols[0], float(cols[1]), float(cols[2]), country, population)
+            except (IndexError, ValueError):
+                continue
+            if place[5] >= min_population:
+                places.append(place)
+    return places
+
+
+def _kd_order(points, lo, hi, depth):
+    """Reorder points[lo:hi] in place into implicit k-d tree order (node at the middle)."""
+    if hi - lo <= 1:
+        return
+    axis = depth % 3
+    points[lo:hi] = sorted(points[lo:hi], key=lambda point: point[0][axis])
+    mid = (lo + hi) // 2
+    _kd_order(points, lo, mid, depth + 1)
+    _kd_order(points, mid + 1, hi, depth + 1)
+
+
+def build_index(gazetteer_path, index_path, min_population=0):
+    """Build a compact on-disk index from a gazetteer file. Returns the number of places."""
+    places = read_gazetteer(gazetteer_path, min_population)
+
+    points = [(_to_xyz(place[2], place[3]), place) for place in places]
+    _kd_order(points, 0, len(points), 0)
+
+    names = bytearray()
+    records = bytearray()
+    keys = {}
+    for number, (xyz, place) in enumerate(points):
+        name, ascii_name, lat, lon, country, population = place
+        encoded = name.encode('utf-8')[:0xFFFF]
+        records += PLACE.pack(lat, lon, *xyz, min(population, 0xFFFFFFFF), len(names),
+                              len(encoded), country.encode('ascii', 'replace')[:2].ljust(2))
+        names += encoded
+        for key in {normalize_query(name), normalize_query(ascii_name)}:
+            if key:
+                keys.setdefault(key.encode('utf-8'), []).append((population, number))
+
+    key_blob = bytearray()
+    entries = bytearray()
+    for key in sorted(keys):
+        offset = len(key_blob)
+        key_blob += key
+        # Most populous place first for names shared by many places
+        for population, number in sorted(keys[key], reverse=True):
+            entries += INDEX_ENTRY.pack(offset, len(key), number)
+
+    places_offset = HEADER.size
+    names_offset = places_offset + len(records)
+    index_offset = names_offset + len(names)
+    keys_offset = index_offset + len(entries)
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(points), len(entries) // INDEX_ENTRY.size,
+                            places_offset, names_offset, index_offset, keys_offset))
+        f.write(records)
+        f.write(names)
+        f.write(entries)
+        f.write(key_blob)
+    os.replace(tmp_path, index_path)
+    return len(points)
+
+
+class OfflineGeocoder:
+    """Forward and reverse geocoder backed by a memory-mapped gazetteer index.
+
+    Forward lookups binary-search the sorted key index for a normalized
+    name prefix; reverse lookups walk the k-d tree the place records are
+    stored in. Nothing is loaded into memory besides the mapping itself.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._file = open(index_path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.place_count, self.key_count, self._places_offset,
+         self._names_offset, self._index_offset, self._keys_offset) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{index_path} is not a gazetteer index")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.place_count
+
+    def _place(self, number):
+        return PLACE.unpack_from(self._map, self._places_offset + number * PLACE.size)
+
+    def _result(self, number):
+        lat, lon, x, y, z, population, name_offset, name_length, country = self._place(number)
+        start = self._names_offset + name_offset
+        name = self._map[start:start + name_length].decode('utf-8')
+        country = country.decode('ascii').strip()
+        address = f"{name}, {country}" if country else name
+        return lat, lon, address
+
+    def _entry(self, position):
+        key_offset, key_length, number = INDEX_ENTRY.unpack_from(
+            self._map, self._index_offset + position * INDEX_ENTRY.size)
+        start = self._keys_offset + key_offset
+        return self._map[start:start + key_length], number
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def search(self, prefix, limit=10, scan_limit=500, exact=False):
+        """Return up to ``limit`` (lat, lon, address) places whose name starts with ``prefix``.
+
+        Exact name matches come first, then the most populous prefix matches
+        among the first ``scan_limit`` index entries. With ``exact`` only
+        places named exactly ``prefix`` are returned.
+        """
+        key = normalize_query(prefix).encode('utf-8')
+        if not key:
+            return []
+
+        exact_matches, prefix_matches = [], []
+        position = self._lower_bound(key)
+        while position < self.key_count and len(exact_matches) + len(prefix_matches) < scan_limit:
+            entry_key, number = self._entry(position)
+            if entry_key == key:
+                exact_matches.append(number)
+            elif entry_key.startswith(key) and not exact:
+                prefix_matches.append(number)
+            else:
+                break
+            position += 1
+
+        prefix_matches.sort(key=lambda number: self._place(number)[5], reverse=True)
+        seen, results = set(), []
+        for number in exact_matches + prefix_matches:
+            if number not in seen:
+                seen.add(number)
+                results.append(self._result(number))
+                if len(results) == limit:
+                    break
+        return results
+
+    def geocode(self, query):
+        """Get (latitude, longitude, address) for a place name, or (None, None, None)."""
+        results = self.search(query, limit=1, exact=True)
+        if results:
+            return results[0]
+        return None, None, None
+
+    def reverse(self, lat, lon):
+        """Get (latitude, longitude, address) of the place nearest to a point."""
+        if not self.place_count:
+            return None, None, None
+
+        target = _to_xyz(lat, lon)
+        best = [float('inf'), -1]
+
+        def visit(lo, hi, depth):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            point = self._place(mid)[2:5]
+            distance = sum((a - b) ** 2 for a, b in zip(point, target))
+            if distance < best[0]:
+                best[0], best[1] = distance, mid
+
+            axis = depth % 3
+            diff = target[axis] - point[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near, depth + 1)
+            if diff * diff < best[0]:
+                visit(*far, depth + 1)
+
+        visit(0, self.place_count, 0)
+        return self._result(best[1])
+
+
+if __name__ == '__main__':
+    import click
+
+    @click.command()
+    @click.argument('gazetteer', type=click.Path(exists=True, dir_okay=False))
+    @click.argument('index', type=click.Path(dir_okay=False))
+    @click.option('--min-population', type=int, default=0, help='Skip places smaller than this')
+    def main(gazetteer, index, min_population):
+        """
+        Build an offline geocoding INDEX from a GAZETTEER TSV file.
+
+        Example: python offline_geocoder.py cities500.txt gazetteer.idx
+        """
+        count = build_index(gazetteer, index, min_population)
+        click.echo(f"Indexed {count} places into {index}")
+
+    main()
@@ -0,0 +1,271 @@
+import email.utils
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from timings import record
+
+# Requests per second allowed to each service (0 for no limit until the service answers 429)
+TOMORROW_RATE_LIMIT = float(os.getenv('TOMORROW_RATE_LIMIT', '3'))
+TOMORROW_RATE_BURST = int(os.getenv('TOMORROW_RATE_BURST', '3'))
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_RATE_LIMIT = float(os.getenv('NOMINATIM_RATE_LIMIT', '1'))
+# How many times a request answered with 429 is queued again before giving up
+RATE_LIMIT_RETRIES = int(os.getenv('RATE_LIMIT_RETRIES', '5'))
+MAX_BACKOFF = 60
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(when.timestamp() - now, 0.0)
+
+
+class TokenBucket:
+    """Space requests out to ``rate`` per second, allowing bursts of ``burst``.
+
+    Requests are queued, never refused: acquire() reserves the next free
+    slot and sleeps until it comes up. After a 429 the bucket pauses for
+    the Retry-After time (or an exponential backoff without one) and halves
+    its rate, then creeps back to the configured rate as requests succeed.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.current_rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        # Theoretical arrival time of the next request (GCRA)
+        self._next = clock()
+        self._paused_until = 0.0
+        self._backoff = 1.0
+        self.acquired = 0
+        self.throttled_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _tolerance(self):
+        # Fixed from the configured rate, so reservations stay consistent as current_rate changes
+        return (self.burst - 1) / self.rate
+
+    def reserve(self):
+        """Reserve the next free slot without waiting; returns the seconds until it comes up.
+
+        For callers that wait their own way, e.g. with asyncio.sleep().
+        """
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._next - self._tolerance(), self._paused_until)
+            self._next = max(self._next, start) + 1 / self.current_rate
+            wait = start - now
+            self.acquired += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def try_acquire(self):
+        """Take a slot only if one is free right now, without queueing; returns whether it did."""
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._next - self._tolerance(), self._paused_until)
+            if start > now:
+                return False
+            self._next = max(self._next, start) + 1 / self.current_rate
+            self.acquired += 1
+            return True
+
+    def acquire(self):
+        """Wait for this request's turn; returns the seconds spent waiting."""
+        wait = self.reserve()
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def throttled(self, retry_after=None):
+        """Back off after the server answered 429."""
+        with self._lock:
+            now = self.clock()
+            if now >= self._paused_until:
+                delay = self._backoff if retry_after is None else retry_after
+                # Requests already in flight will hit the same 429; slow down once per pause
+                self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+                self.current_rate = max(self.current_rate / 2, self.rate / 16)
+            else:
+                # Part of the current pause, which only an explicit Retry-After extends
+                delay = 0.0 if retry_after is None else retry_after
+            until = now + delay
+            self._paused_until = max(self._paused_until, until)
+            # No burst straight after a pause
+            self._next = max(self._next, until + self._tolerance())
+            self.throttled_count += 1
+
+    def succeeded(self):
+        with self._lock:
+            self._backoff = 1.0
+            if self.current_rate < self.rate:
+                self.current_rate = min(self.rate, self.current_rate + self.rate / 10)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'current_rate': self.current_rate,
+                'acquired': self.acquired,
+                'throttled': self.throttled_count,
+                'avg_wait': self.total_wait / self.acquired if self.acquired else 0.0,
+                'max_wait': self.max_wait
+            }
+
+
+class RateLimiter:
+    """A token bucket per registered host; requests to other hosts are not limited."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def limit(self, host, rate, burst=1):
+        """Limit requests to ``host``, keeping the stricter limit if it already has one.
+
+        A rate of 0 sets no limit of its own, but 429s from the host still
+        pause its requests for the Retry-After time.
+        """
+        if rate <= 0:
+            rate = float('inf')
+        with self._lock:
+            existing = self._buckets.get(host)
+            if existing is None or rate < existing.rate:
+                self._buckets[host] = TokenBucket(rate, burst)
+
+    def bucket(self, host):
+        with self._lock:
+            return self._buckets.get(host)
+
+    def stats(self):
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.stats() for host, bucket in buckets.items()}
+
+
+class RateLimited(Exception):
+    """A request made under without_queueing() found its host's rate limit busy."""
+
+
+_local = threading.local()
+
+
+@contextmanager
+def without_queueing():
+    """Make requests from this thread fail with RateLimited instead of waiting for a slot.
+
+    For optional requests, such as type-ahead suggestions, that should never
+    hold up (or queue in front of) the ones a user is waiting for. A 429
+    still backs the host off, but isn't retried.
+    """
+    previous = getattr(_local, 'no_queue', False)
+    _local.no_queue = True
+    try:
+        yield
+    finally:
+        _local.no_queue = previous
+
+
+@contextmanager
+def on_dequeue(callback):
+    """Call ``callback()`` whenever a request from this thread leaves its host's queue and is sent.
+
+    Lets a caller time a request from when it really went out, e.g. to
+    decide when to hedge it.
+    """
+    previous = getattr(_local, 'on_dequeue', None)
+    _local.on_dequeue = callback
+    try:
+        yield
+    finally:
+        _local.on_dequeue = previous
+
+
+def _dequeued():
+    callback = getattr(_local, 'on_dequeue', None)
+    if callback is not None:
+        callback()
+
+
+class RateLimitedAdapter:
+    """Wrap a requests transport adapter so each request waits for its host's bucket.
+
+    429 responses are retried (up to ``retries`` times) after the bucket has
+    backed off, instead of being returned to the caller. The time spent
+    queued is recorded as the 'queue' timing phase.
+    """
+
+    def __init__(self, adapter, limiter, retries=RATE_LIMIT_RETRIES):
+        retry = getattr(adapter, 'max_retries', None)
+        if hasattr(retry, 'new'):
+            # urllib3 would otherwise sleep out Retry-After on its own, bypassing the bucket
+            adapter.max_retries = retry.new(respect_retry_after_header=False)
+        self.adapter = adapter
+        self.limiter = limiter
+        self.retries = retries
+
+    def send(self, request, **kwargs):
+        bucket = self.limiter.bucket(urlsplit(request.url).netloc)
+        if bucket is None:
+            _dequeued()
+            return self.adapter.send(request, **kwargs)
+
+        if getattr(_local, 'no_queue', False):
+            if not bucket.try_acquire():
+                raise RateLimited(f"No free request slot for {urlsplit(request.url).netloc}")
+            _dequeued()
+            response = self.adapter.send(request, **kwargs)
+            if response.status_code == 429:
+                bucket.throttled(parse_retry_after(response.headers.get('Retry-After')))
+            else:
+                bucket.succeeded()
+            return response
+
+        attempt = 0
+        while True:
+            record('queue', bucket.acquire())
+            _dequeued()
+            response = self.adapter.send(request, **kwargs)
+            if response.status_code != 429:
+                bucket.succeeded()
+                return response
+
+            bucket.throttled(parse_retry_after(response.headers.get('Retry-After')))
+            if attempt == self.retries:
+                return response
+            attempt += 1
+            # Read the (small) error body first so the connection can be reused
+            response.content
+            response.close()
+
+    def close(self):
+        self.adapter.close()
+
+
+def limit_session(session, limiter):
+    """Route every adapter mounted on a requests session through the limiter."""
+    for prefix, adapter in list(session.adapters.items()):
+        if not isinstance(adapter, RateLimitedAdapter):
+            session.mount(prefix, RateLimitedAdapter(adapter, limiter))
+
+
+# Shared by every session in the process; weather_api registers the services' hosts
+rate_limiter = RateLimiter()
@@ -0,0 +1,256 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from weather_api import CURRENT_TIMESTEPS, forecast_cache, geocode, parse_location, refresh_forecast, last_known
+
+# Upstream forecast calls the scheduler may make per hour, spread out evenly
+REFRESH_BUDGET = int(os.getenv('REFRESH_BUDGET', '60'))
+# Refreshes allowed to run at the same time
+REFRESH_CONCURRENCY = int(os.getenv('REFRESH_CONCURRENCY', '2'))
+# Refresh when between half of this fraction and this fraction of the TTL is left
+REFRESH_JITTER = float(os.getenv('REFRESH_JITTER', '0.2'))
+SAVED_LOCATIONS_PATH = os.getenv(
+    'SAVED_LOCATIONS_PATH',
+    os.path.join(os.path.expanduser('~'), '.weather_app', 'locations.txt')
+)
+
+
+def load_saved_locations(path=SAVED_LOCATIONS_PATH):
+    """Read one location per line, skipping blank lines and # comments."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+    except OSError:
+        return []
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+class RefreshScheduler:
+    """Keep the forecasts for a set of locations warm in the forecast cache.
+
+    Each location is refreshed shortly before its cache entry expires, at a
+    random point in the last ``jitter`` fraction of the TTL, so locations
+    drift apart instead of expiring together. Refreshes start at least
+    3600 / ``budget`` seconds apart, which keeps upstream calls within
+    ``budget`` per hour and spreads them evenly, and at most
+    ``max_concurrent`` run at once. Locations whose cache entry was renewed
+    by a regular lookup are rescheduled without calling upstream.
+
+    ``on_refresh(location, address, current)`` and ``on_error(location,
+    error)`` are called from worker threads.
+    """
+
+    def __init__(self, locations=(), ttl=None, budget=REFRESH_BUDGET,
+                 max_concurrent=REFRESH_CONCURRENCY, jitter=REFRESH_JITTER,
+                 on_refresh=None, on_error=None, clock=time.monotonic):
+        self.ttl = forecast_cache.ttl if ttl is None else ttl
+        self.budget = budget
+        self.interval = 3600 / budget
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.on_refresh = on_refresh
+        self.on_error = on_error
+        self.clock = clock
+
+        self._locations = set()
+        self._queue = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_concurrent)
+        self._executor = None
+        self._thread = None
+        self._stopped = False
+        self._next_start = clock()
+
+        self.refreshed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.max_lag = 0.0
+
+        for location in locations:
+            self.add(location)
+
+    @property
+    def locations(self):
+        with self._cond:
+            return sorted(self._locations)
+
+    def add(self, location, due=None):
+        """Start keeping a location fresh; its first refresh is due immediately."""
+        with self._cond:
+            if location in self._locations:
+                return
+            self._locations.add(location)
+            self._push(self.clock() if due is None else due, location)
+
+    def remove(self, location):
+        with self._cond:
+            # Its queue entry is dropped when it comes up
+            self._locations.discard(location)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='weather-refresh')
+        self._thread = threading.Thread(target=self._run, name='weather-refresh-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=False):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        self._thread = None
+
+    def next_due(self, stored_at):
+        """When to refresh an entry stored at ``stored_at`` (on the scheduler's clock)."""
+        left = self.ttl * self.jitter * random.uniform(0.5, 1.0)
+        return stored_at + self.ttl - left
+
+    def stats(self):
+        with self._cond:
+            locations = len(self._locations)
+            stats = {
+                'locations': locations,
+                'refreshed': self.refreshed,
+                'skipped': self.skipped,
+                'failed': self.failed,
+                'max_lag': self.max_lag
+            }
+        # Calls per hour needed to keep every location fresh
+        stats['needed_per_hour'] = locations * 3600 / self.ttl / (1 - self.jitter * 0.75)
+        stats['budget_per_hour'] = self.budget
+        return stats
+
+    def _push(self, due, location):
+        heapq.heappush(self._queue, (due, next(self._order), location))
+        self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = self.clock()
+                    if self._queue:
+                        start_at = max(self._queue[0][0], self._next_start)
+                        if start_at <= now:
+                            break
+                        self._cond.wait(start_at - now)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+
+                due, _, location = heapq.heappop(self._queue)
+                if location not in self._locations:
+                    continue
+                self._next_start = now + self.interval
+                self.max_lag = max(self.max_lag, now - due)
+
+            # Wait for a free slot, giving up if the scheduler is stopped meanwhile
+            while not self._slots.acquire(timeout=1):
+                if self._stopped:
+                    return
+            self._executor.submit(self._refresh, location)
+
+    def _refresh(self, location):
+        try:
+            try:
+                # Saved as coordinates, which need no geocoding
+                lat, lon = parse_location(location)
+                address = f"{lat},{lon}"
+            except ValueError:
+                lat, lon, address = geocode(location)
+            if lat is None or lon is None:
+                raise ValueError(f"Location not found: {location}")
+
+            # A regular lookup may have renewed the entry since this was scheduled
+            age = forecast_cache.age(lat, lon, CURRENT_TIMESTEPS)
+            if age is not None:
+                due = self.next_due(self.clock() - age)
+                if due > self.clock() + self.interval:
+                    with self._cond:
+                        self.skipped += 1
+                    self._reschedule(due, location)
+                    return
+
+            # The GUIs only show current conditions, so that's all that is kept warm
+            data = refresh_forecast(lat, lon, CURRENT_TIMESTEPS)
+            current = data['timelines']['minutely'][0]['values']
+            last_known.put(location, address, current)
+        except Exception as error:
+            with self._cond:
+                self.failed += 1
+            # Try again a full TTL later so failures don't eat into the budget
+            self._reschedule(self.clock() + self.ttl, location)
+            if self.on_error is not None:
+                self.on_error(location, error)
+        else:
+            with self._cond:
+                self.refreshed += 1
+            self._reschedule(self.next_due(self.clock()), location)
+            if self.on_refresh is not None:
+                self.on_refresh(location, address, current)
+        finally:
+            self._slots.release()
+
+    def _reschedule(self, due, location):
+        with self._cond:
+            if location in self._locations and not self._stopped:
+                self._push(due, location)
+
+
+if __name__ == '__main__':
+    import click
+
+    @click.command()
+    @click.argument('locations', nargs=-1)
+    @click.option('--file', '-f', 'path', type=click.Path(dir_okay=False), default=SAVED_LOCATIONS_PATH,
+                  show_default=True, help='File with one location per line')
+    @click.option('--budget', type=click.IntRange(min=1), default=REFRESH_BUDGET, show_default=True,
+                  help='Upstream forecast calls allowed per hour')
+    @click.option('--concurrency', '-j', type=click.IntRange(min=1), default=REFRESH_CONCURRENCY,
+                  show_default=True, help='Refreshes allowed to run at once')
+    def main(locations, path, budget, concurrency):
+        """
+        Keep the forecasts for LOCATIONS (and the saved locations file) fresh.
+
+        Prints each refresh until interrupted with Ctrl+C.
+        """
+        locations = list(locations) + load_saved_locations(path)
+        if not locations:
+            raise click.UsageError(f"No locations given and none saved in {path}")
+
+        def on_refresh(location, address, current):
+            click.echo(f"{time.strftime('%H:%M:%S')} {location}: {current['temperature']:.1f}°C ({address})")
+
+        def on_error(location, error):
+            click.echo(f"{time.strftime('%H:%M:%S')} {location}: {error}", err=True)
+
+        scheduler = RefreshScheduler(
+            locations, budget=budget, max_concurrent=concurrency,
+            on_refresh=on_refresh, on_error=on_error
+        )
+        stats = scheduler.stats()
+        if stats['needed_per_hour'] > budget:
+            click.echo(
+                f"Warning: {stats['locations']} locations need about {stats['needed_per_hour']:.0f} "
+                f"calls per hour, above the budget of {budget}; refreshes will run late",
+                err=True
+            )
+
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            scheduler.stop()
+
+    main()
@@ -0,0 +1,145 @@
+import os
+import threading
+import tkinter as tk
+
+from suggestions import suggester
+from weather_api import parse_location, suggest_place
+
+# Milliseconds typing has to pause before the text is looked up online
+SUGGEST_DELAY = int(os.getenv('SUGGEST_DELAY', '750'))
+# Set to 0 to only suggest places that are already known locally
+SUGGEST_ONLINE = os.getenv('SUGGEST_ONLINE', '1').lower() not in ('0', 'false', 'no')
+SUGGEST_MIN_CHARS = 3
+
+
+class SuggestionBox:
+    """Drop-down list of place suggestions under a location entry.
+
+    Every keystroke shows the matches from the local index straight away.
+    Once typing pauses for SUGGEST_DELAY ms, a name nothing local knows is
+    geocoded in the background and added to the list, unless Nominatim's
+    rate limit is busy; typing again cancels that lookup. Picking a
+    suggestion calls on_pick(text, place) with its (lat, lon, address), so
+    the search can skip geocoding.
+    """
+
+    def __init__(self, root, entry, worker, on_pick, **listbox_options):
+        self.root = root
+        self.entry = entry
+        self.worker = worker
+        self.on_pick = on_pick
+        self.listbox = tk.Listbox(root, activestyle='none', exportselection=False, **listbox_options)
+        self.suggestions = []
+        self._text = entry.get()
+        self._after_id = None
+        self._cancelled = None
+
+        entry.bind('<KeyRelease>', self.on_key, add='+')
+        entry.bind('<Down>', self.focus_list, add='+')
+        entry.bind('<Return>', lambda e: self.hide(), add='+')
+        entry.bind('<Escape>', lambda e: self.hide(), add='+')
+        entry.bind('<FocusOut>', self.on_focus_out, add='+')
+        self.listbox.bind('<ButtonRelease-1>', self.choose)
+        self.listbox.bind('<Return>', self.choose)
+        self.listbox.bind('<Escape>', self.back_to_entry)
+        self.listbox.bind('<FocusOut>', self.on_focus_out)
+
+    def on_key(self, event):
+        text = self.entry.get()
+        if text == self._text:
+            # Arrow keys and the like
+            return
+        self._text = text
+        self.cancel_lookup()
+        self.show(suggester.search(text))
+        if SUGGEST_ONLINE and self.wants_lookup(text):
+            self._after_id = self.root.after(SUGGEST_DELAY, self.lookup, text)
+
+    def wants_lookup(self, text):
+        text = text.strip()
+        if len(text) < SUGGEST_MIN_CHARS or suggester.knows(text):
+            return False
+        try:
+            parse_location(text)
+        except ValueError:
+            return True
+        return False
+
+    def cancel_lookup(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._cancelled is not None:
+            # Stops a lookup still waiting for a worker from sending its request
+            self._cancelled.set()
+            self._cancelled = None
+        self.worker.cancel('suggest')
+
+    def lookup(self, text):
+        self._after_id = None
+        self._cancelled = threading.Event()
+        self.worker.submit(
+            'suggest', suggest_place, text, self._cancelled,
+            on_success=lambda place: self.add_lookup_result(text, place),
+            on_error=lambda error: None
+        )
+
+    def add_lookup_result(self, text, place):
+        if place[0] is None:
+            return
+        suggester.add(text, place)
+        if self.entry.get() == text and self.entry.focus_get() is self.entry:
+            self.show(suggester.search(text))
+
+    def show(self, suggestions):
+        self.suggestions = suggestions
+        self.listbox.delete(0, tk.END)
+        if not suggestions:
+            self.hide()
+            return
+        for label, _ in suggestions:
+            self.listbox.insert(tk.END, label)
+        self.listbox.configure(height=len(suggestions))
+        self.listbox.place(in_=self.entry, x=0, rely=1.0, relwidth=1.0)
+        self.listbox.lift()
+
+    def hide(self):
+        self.cancel_lookup()
+        self.listbox.place_forget()
+
+    def focus_list(self, event):
+        if not self.suggestions:
+            return None
+        self.listbox.focus_set()
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(0)
+        self.listbox.activate(0)
+        return 'break'
+
+    def back_to_entry(self, event):
+        self.hide()
+        self.entry.focus_set()
+
+    def on_focus_out(self, event):
+        # Focus moves between the entry and the list while choosing; only hide once it leaves both
+        self.root.after(100, self._hide_if_unfocused)
+
+    def _hide_if_unfocused(self):
+        try:
+            focus = self.root.focus_get()
+        except KeyError:
+            focus = None
+        if focus not in (self.entry, self.listbox):
+            self.hide()
+
+    def choose(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        label, place = self.suggestions[selection[0]]
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, label)
+        self._text = label
+        self.hide()
+        self.entry.focus_set()
+        self.on_pick(label, place)
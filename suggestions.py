@@ -0,0 +1,124 @@
+import bisect
+import threading
+
+from geocode_cache import normalize_query
+from weather_api import geocode_cache, last_known, offline_geocoder, parse_location
+
+
+class Suggester:
+    """Type-ahead place suggestions from local data only.
+
+    Names from the search history and the geocode cache (both the text
+    searched for and the address it resolved to) are kept in a sorted list,
+    so the places starting with what has been typed are found by binary
+    search. Places searched before come first, most recent first, then
+    matches from the offline gazetteer if there is one. The index is built
+    on first use; refresh() rebuilds it to pick up newly cached places.
+    """
+
+    def __init__(self, geocode_cache, last_known, offline_geocoder=None, limit=8, scan_limit=200):
+        self.geocode_cache = geocode_cache
+        self.last_known = last_known
+        self.offline_geocoder = offline_geocoder
+        self.limit = limit
+        self.scan_limit = scan_limit
+        self._lock = threading.Lock()
+        # Sorted normalized names, and name -> (label, place, searched_at)
+        self._keys = None
+        self._places = {}
+
+    def refresh(self):
+        """Rebuild the index from the history and geocode cache, e.g. after a search.
+
+        The new index is built before it replaces the old one, so searches
+        meanwhile aren't held up.
+        """
+        places, resolved = {}, {}
+        for query, place in self.geocode_cache.items():
+            resolved[query] = place
+            _put(places, query, place[2], place, 0.0)
+            _put(places, normalize_query(place[2]), place[2], place, 0.0)
+
+        for query, address, fetched_at in self.last_known.items():
+            place = resolved.get(query)
+            if place is None:
+                try:
+                    # Searched for as coordinates; their address is the "lat,lon" text
+                    place = (*parse_location(address), address)
+                except ValueError:
+                    # Found in the gazetteer; picking it looks the address up again
+                    place = None
+            # Coordinate keys keep their signs and decimal points; match them as typed text instead
+            _put(places, normalize_query(query), address, place, fetched_at)
+            _put(places, normalize_query(address), address, place, fetched_at)
+
+        keys = sorted(places)
+        with self._lock:
+            self._keys, self._places = keys, places
+
+    def add(self, name, place, searched_at=0.0):
+        """Suggest ``place`` (lat, lon, address) for names starting like ``name``."""
+        if self._keys is None:
+            self.refresh()
+        key = normalize_query(name)
+        with self._lock:
+            if key and key not in self._places:
+                bisect.insort(self._keys, key)
+            _put(self._places, key, place[2], place, searched_at)
+
+    def knows(self, text):
+        """Whether ``text`` already names a place in the index."""
+        if self._keys is None:
+            self.refresh()
+        with self._lock:
+            return normalize_query(text) in self._places
+
+    def search(self, text):
+        """Up to ``limit`` (label, place) suggestions for what has been typed so far.
+
+        ``place`` is (lat, lon, address), or None if it still has to be geocoded.
+        """
+        key = normalize_query(text)
+        if not key:
+            return []
+        if self._keys is None:
+            self.refresh()
+
+        with self._lock:
+            start = bisect.bisect_left(self._keys, key)
+            matches = []
+            for name in self._keys[start:start + self.scan_limit]:
+                if not name.startswith(key):
+                    break
+                matches.append(self._places[name])
+
+        # Stable, so places never searched for stay in alphabetical order
+        matches.sort(key=lambda match: match[2], reverse=True)
+        seen, results = set(), []
+        for label, place, _ in matches:
+            if label not in seen:
+                seen.add(label)
+                results.append((label, place))
+                if len(results) == self.limit:
+                    return results
+
+        if self.offline_geocoder is not None:
+            for place in self.offline_geocoder.search(text, limit=self.limit - len(results)):
+                if place[2] not in seen:
+                    seen.add(place[2])
+                    results.append((place[2], place))
+        return results
+
+
+def _put(places, key, label, place, searched_at):
+    if not key:
+        return
+    previous = places.get(key)
+    if previous is not None:
+        # Keep the rank of a name that was searched for
+        searched_at = max(searched_at, previous[2])
+    places[key] = (label, place, searched_at)
+
+
+# Shared by the GUIs
+suggester = Suggester(geocode_cache, last_known, offline_geocoder)
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads its configuration at import time; keep the tests off the real caches and services
+_scratch = tempfile.mkdtemp(prefix='weather-tests-')
+os.environ.update({
+    'GEOCODE_CACHE_PATH': os.path.join(_scratch, 'geocode_cache.json'),
+    'LAST_KNOWN_PATH': os.path.join(_scratch, 'last_known.json'),
+    'SAVED_LOCATIONS_PATH': os.path.join(_scratch, 'locations.txt'),
+    'TOMORROW_API_KEY': 'test',
+    'TOMORROW_BASE_URL': 'http://127.0.0.1:9/v4/weather/forecast',
+    'NOMINATIM_URL': 'http://127.0.0.1:9',
+})
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import sys
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+pytest.importorskip('aiohttp')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import weather_async
+from geocode_cache import GeocodeCache
+from rate_limiter import RateLimiter
+from stub_server import FORECAST_PATH, StubServer
+from weather_async import AsyncWeatherClient
+from weather_cache import ForecastCache
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(latency=0.005, jitter=0.0)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    geocode_cache = GeocodeCache(str(tmp_path / 'geocode_cache.json'))
+    monkeypatch.setattr(weather_async, 'geocode_cache', geocode_cache)
+    monkeypatch.setattr(weather_async, 'forecast_cache', ForecastCache())
+    monkeypatch.setattr(weather_async, 'rate_limiter', RateLimiter())
+    return geocode_cache
+
+
+def client_for(stub):
+    return AsyncWeatherClient(base_url=stub.base_url + FORECAST_PATH, nominatim_url=stub.base_url, api_key='stub')
+
+
+def test_get_weather_for_place(stub, caches):
+    async def lookup():
+        async with client_for(stub) as client:
+            return await client.get_weather_for_place('Benchville')
+
+    address, weather = asyncio.run(lookup())
+    assert address == 'Benchville, Stubland'
+    assert 'temperature' in weather
+    assert caches.get('Benchville')[2] == address
+
+
+def test_unknown_place(stub, caches):
+    async def lookup():
+        async with client_for(stub) as client:
+            return await client.get_weather_for_place('Nowhere')
+
+    assert asyncio.run(lookup()) == (None, None)
+
+
+class Gazetteer:
+    def __init__(self, places):
+        self.places = places
+
+    def geocode(self, location):
+        return self.places.get(location, (None, None, None))
+
+
+def test_geocode_asks_the_gazetteer_first(stub, caches, monkeypatch):
+    monkeypatch.setattr(weather_async, 'offline_geocoder', Gazetteer({'Boston': (42.36, -71.06, 'Boston, US')}))
+
+    async def lookup():
+        async with client_for(stub) as client:
+            return await client.geocode('Boston'), await client.geocode('Benchville')
+
+    offline, online = asyncio.run(lookup())
+    assert offline == (42.36, -71.06, 'Boston, US')
+    assert online[2] == 'Benchville, Stubland'
+    assert stub.requests == 1
+
+
+def test_geocode_offline_only_never_asks_nominatim(stub, caches, monkeypatch):
+    monkeypatch.setattr(weather_async, 'GEOCODER_OFFLINE_ONLY', True)
+
+    async def lookup(gazetteer):
+        monkeypatch.setattr(weather_async, 'offline_geocoder', gazetteer)
+        async with client_for(stub) as client:
+            return await client.geocode('Benchville')
+
+    assert asyncio.run(lookup(None)) == (None, None, None)
+    assert asyncio.run(lookup(Gazetteer({}))) == (None, None, None)
+    assert stub.requests == 0
+
+
+def test_geocode_cache_saved_off_the_event_loop(stub, caches, monkeypatch):
+    save = caches.save
+    saved_on = []
+
+    def record_save():
+        saved_on.append(threading.current_thread())
+        save()
+
+    monkeypatch.setattr(caches, 'save', record_save)
+
+    async def lookup():
+        async with client_for(stub) as client:
+            await client.geocode('Benchville')
+            return threading.current_thread()
+
+    loop_thread = asyncio.run(lookup())
+    assert saved_on and loop_thread not in saved_on
+    assert os.path.exists(caches.path)
+
+
+def test_concurrent_lookups_share_a_request(stub, caches):
+    async def lookup():
+        async with client_for(stub) as client:
+            results = await client.get_weather_many(['42.3478,-71.0466'] * 5)
+            return client.coalesced, results
+
+    coalesced, results = asyncio.run(lookup())
+    assert coalesced == 4
+    assert all(result == results[0] for result in results)
+
+
+def test_rate_limited_requests_are_retried(caches):
+    server = StubServer(latency=0.0, jitter=0.0, rate_limit=3)
+    server.start()
+    try:
+        host = urlsplit(server.base_url).netloc
+        weather_async.rate_limiter.limit(host, 0)
+
+        async def lookup():
+            async with client_for(server) as client:
+                return await client.get_weather_many([f"{index}.5,{index}.25" for index in range(6)])
+
+        results = asyncio.run(lookup())
+    finally:
+        server.stop()
+
+    assert not [result for result in results if isinstance(result, Exception)]
+    bucket = weather_async.rate_limiter.bucket(host)
+    assert bucket.throttled_count > 0
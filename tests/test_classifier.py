@@ -0,0 +1,70 @@
+import itertools
+import math
+
+import pytest
+
+import classifier
+from classifier import LABELS, classify, classify_one, labels
+
+NAN = math.nan
+# Each threshold, either side of it and NaN
+PRECIPITATION = [0, 49.9, 50, 50.1, 100, NAN]
+TEMPERATURE = [-10, -0.1, 0, 0.1, 25, NAN]
+CLOUD_COVER = [0, 29.9, 30, 30.1, 69.9, 70, 70.1, 100, NAN]
+GRID = list(itertools.product(PRECIPITATION, TEMPERATURE, CLOUD_COVER))
+
+
+def original_description(conditions):
+    """get_weather_description() as it was before the classifier, for reference."""
+    if conditions['precipitationProbability'] > 50:
+        if conditions['temperature'] <= 0:
+            return "Snowy"
+        return "Rainy"
+    elif conditions['cloudCover'] > 70:
+        return "Cloudy"
+    elif conditions['cloudCover'] > 30:
+        return "Partly cloudy"
+    else:
+        return "Clear"
+
+
+def expected():
+    return [
+        original_description({'precipitationProbability': p, 'temperature': t, 'cloudCover': c})
+        for p, t, c in GRID
+    ]
+
+
+def columns():
+    return [list(column) for column in zip(*GRID)]
+
+
+@pytest.fixture(params=['fallback', 'numpy'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        numpy = pytest.importorskip('numpy')
+    else:
+        numpy = None
+    monkeypatch.setattr(classifier, 'numpy', numpy)
+    monkeypatch.setattr(classifier, '_numpy_checked', True)
+    return request.param
+
+
+def test_classify_matches_original(backend):
+    assert labels(classify(*columns())) == expected()
+
+
+def test_classify_one_matches_original():
+    assert [LABELS[classify_one(p, t, c)] for p, t, c in GRID] == expected()
+
+
+def test_custom_thresholds(backend):
+    thresholds = {'cloudy': 80, 'freezing': 2}
+    codes = classify(*columns(), thresholds=thresholds)
+    assert list(codes) == [classify_one(p, t, c, thresholds) for p, t, c in GRID]
+    assert LABELS[classify([0], [20], [75], thresholds)[0]] == "Partly cloudy"
+    assert LABELS[classify([60], [1], [0], thresholds)[0]] == "Snowy"
+
+
+def test_empty(backend):
+    assert len(classify([], [], [])) == 0
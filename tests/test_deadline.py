@@ -0,0 +1,125 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded, Hedger
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_deadline_caps_timeouts():
+    clock = Clock()
+    deadline = Deadline(5, clock=clock)
+    assert deadline.timeout() == 5
+    assert deadline.timeout(3) == 3
+    clock.now = 3
+    assert deadline.remaining() == 2
+    assert deadline.timeout(3) == 2
+    assert deadline.timeout((1, 10)) == (1, 2)
+    assert not deadline.expired()
+
+
+def test_deadline_expired():
+    clock = Clock()
+    deadline = Deadline(1, clock=clock)
+    clock.now = 1.5
+    assert deadline.expired()
+    assert deadline.remaining() == 0
+    with pytest.raises(DeadlineExceeded) as raised:
+        deadline.timeout(3)
+    assert raised.value.budget == 1
+
+
+def sleeper(seconds, result):
+    def fn(*args, timeout=None):
+        time.sleep(seconds)
+        return result
+    return fn
+
+
+def test_fast_call_is_not_hedged():
+    hedger = Hedger(delay=0.5, max_ratio=1.0)
+    assert hedger.call(Deadline(2), sleeper(0.01, 'first')) == 'first'
+    assert hedger.stats()['hedged'] == 0
+    assert hedger.latency.count == 1
+
+
+def test_slow_call_is_hedged_and_duplicate_wins():
+    hedger = Hedger(delay=0.05, max_ratio=1.0)
+    result = hedger.call(Deadline(2), sleeper(1.0, 'first'), hedge=sleeper(0.01, 'duplicate'))
+    assert result == 'duplicate'
+    stats = hedger.stats()
+    assert (stats['calls'], stats['hedged'], stats['hedge_wins']) == (1, 1, 1)
+
+
+def test_first_attempt_can_still_win():
+    hedger = Hedger(delay=0.05, max_ratio=1.0)
+    result = hedger.call(Deadline(2), sleeper(0.15, 'first'), hedge=sleeper(1.0, 'duplicate'))
+    assert result == 'first'
+    assert hedger.stats()['hedge_wins'] == 0
+
+
+def test_max_ratio_limits_duplicates():
+    hedger = Hedger(delay=0.01, max_ratio=0.5)
+    for _ in range(4):
+        hedger.call(Deadline(2), sleeper(0.05, 'first'), hedge=sleeper(0.0, 'duplicate'))
+    assert hedger.stats()['hedged'] == 2
+
+    never = Hedger(delay=0.01, max_ratio=0)
+    assert never.call(Deadline(2), sleeper(0.05, 'first')) == 'first'
+    assert never.stats()['hedged'] == 0
+
+
+def test_deadline_exceeded():
+    hedger = Hedger(delay=0.02, max_ratio=1.0)
+    with pytest.raises(DeadlineExceeded):
+        hedger.call(Deadline(0.1), sleeper(1.0, 'first'))
+    assert hedger.stats()['deadline_misses'] == 1
+
+
+def test_error_is_raised():
+    def fail(timeout=None):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        Hedger(delay=0.5).call(Deadline(2), fail)
+
+
+def test_timeout_is_capped_by_deadline():
+    seen = []
+
+    def fn(timeout=None):
+        seen.append(timeout)
+        return 'ok'
+
+    Hedger().call(Deadline(2), fn, timeout=(3.05, 10))
+    assert seen[0][0] <= 2 and seen[0][1] <= 2
+
+
+def test_time_in_local_queue_does_not_trigger_hedge():
+    local = threading.local()
+
+    @contextmanager
+    def queue_hook(callback):
+        local.callback = callback
+        yield
+
+    def queued(timeout=None):
+        time.sleep(0.3)        # waiting for a rate limit slot
+        local.callback()       # request goes out
+        time.sleep(0.02)
+        return 'first'
+
+    hedger = Hedger(delay=0.1, max_ratio=1.0, queue_hook=queue_hook)
+    assert hedger.call(Deadline(2), queued, hedge=sleeper(0.0, 'duplicate')) == 'first'
+    assert hedger.stats()['hedged'] == 0
+    # Timed from when the request went out, not from the start of the call
+    assert hedger.latency.quantile(0.5) < 0.2
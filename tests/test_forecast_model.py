@@ -0,0 +1,86 @@
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from forecast_model import Forecast, Timeline, parse_time
+from payloads import DAILY_TIME_FIELDS, make_forecast_payload
+
+STEPS = [
+    {'time': '2024-01-01T00:00:00Z', 'values': {'temperature': 1.5, 'humidity': 80}},
+    {'time': '2024-01-01T01:00:00Z', 'values': {'temperature': 2.5}},
+    {'time': '2024-01-01T02:00:00Z', 'values': {'temperature': None, 'humidity': 70}},
+    {'time': '2024-01-01T03:00:00Z', 'values': {'temperature': 4.0, 'humidity': 60}},
+]
+
+
+def test_parse_time():
+    assert parse_time('2024-01-01T00:00:00Z') == 1704067200.0
+    assert parse_time('2024-01-01T01:00:00+01:00') == 1704067200.0
+    assert parse_time(1704067200) == 1704067200.0
+
+
+def test_from_steps():
+    timeline = Timeline.from_steps('hourly', STEPS)
+    assert len(timeline) == 4
+    assert timeline.fields == ['temperature', 'humidity']
+    assert list(timeline.column('temperature'))[:2] == [1.5, 2.5]
+    assert math.isnan(timeline.column('temperature')[2])
+    assert math.isnan(timeline.column('humidity')[1])
+
+
+def test_values_skip_missing():
+    timeline = Timeline.from_steps('hourly', STEPS)
+    assert timeline.values(0) == {'temperature': 1.5, 'humidity': 80}
+    assert timeline.values(1) == {'temperature': 2.5}
+    assert timeline.values(2) == {'humidity': 70}
+
+
+def test_slice():
+    timeline = Timeline.from_steps('hourly', STEPS)
+    part = timeline.slice('2024-01-01T01:00:00Z', '2024-01-01T03:00:00Z', fields=['humidity'])
+    assert len(part) == 2
+    assert part.fields == ['humidity']
+    assert part.timestamps[0] == parse_time('2024-01-01T01:00:00Z')
+    assert part.values(1) == {'humidity': 70}
+    assert len(timeline.slice(start='2024-01-01T02:30:00Z')) == 1
+    assert len(timeline.slice(end='2024-01-01T00:00:00Z')) == 0
+
+
+def test_head_and_index_at():
+    timeline = Timeline.from_steps('hourly', STEPS)
+    assert len(timeline.head(2)) == 2
+    assert timeline.head(2).values(1) == {'temperature': 2.5}
+    assert timeline.index_at('2024-01-01T01:30:00Z') == 1
+    assert timeline.index_at('2023-12-31T00:00:00Z') == 0
+
+
+def test_string_fields_are_kept():
+    steps = [
+        {'time': '2024-01-01T00:00:00Z', 'values': {'temperatureMax': 3, 'sunriseTime': '2024-01-01T12:13:00Z'}},
+        {'time': '2024-01-02T00:00:00Z', 'values': {'temperatureMax': 4}},
+    ]
+    timeline = Timeline.from_steps('daily', steps)
+    assert timeline.values(0) == {'temperatureMax': 3.0, 'sunriseTime': '2024-01-01T12:13:00Z'}
+    assert timeline.values(1) == {'temperatureMax': 4.0}
+    assert timeline.slice(fields=['sunriseTime']).column('sunriseTime') == ['2024-01-01T12:13:00Z', None]
+    assert timeline.head(1).values(0)['sunriseTime'] == '2024-01-01T12:13:00Z'
+
+
+def test_forecast_from_payload():
+    forecast = Forecast.from_payload(make_forecast_payload())
+    assert 'minutely' in forecast and 'nowcast' not in forecast
+    assert len(forecast.hourly) == 120
+    assert set(DAILY_TIME_FIELDS) <= set(forecast.daily.values(0))
+    assert 'temperature' in forecast.current()
+    assert forecast.location == {'lat': 42.3478, 'lon': -71.0466}
+
+
+def test_missing_timeline():
+    forecast = Forecast.from_payload({'timelines': {'hourly': STEPS}})
+    assert forecast.minutely is None
+    with pytest.raises(KeyError):
+        forecast['daily']
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from json_select import extract, extract_stream
+
+DOCUMENT = json.dumps({
+    'note': 'braces } ] { [ and "quotes" \\" inside strings',
+    'data': {
+        'timelines': [
+            {'timestep': '1d', 'intervals': [{'values': {'temperature': -0.5}}]},
+            {'timestep': '1h', 'intervals': [
+                {'startTime': 'a"b', 'values': {'temperature': 2.5e-3, 'weatherCode': 1000, 'wet': False}},
+                {'values': {'temperature': 12, 'label': 'x}"]'}}
+            ]}
+        ]
+    },
+    'tail': [1, 2, 3]
+})
+
+PATHS = [
+    ('note',),
+    ('data', 'timelines', 0, 'intervals', 0, 'values', 'temperature'),
+    ('data', 'timelines', 1, 'timestep'),
+    ('data', 'timelines', 1, 'intervals', 0, 'values'),
+    ('data', 'timelines', 1, 'intervals', 0, 'values', 'temperature'),
+    ('data', 'timelines', 1, 'intervals', 0, 'values', 'wet'),
+    ('data', 'timelines', 1, 'intervals', 1, 'values', 'label'),
+    ('tail',),
+    ('tail', 2),
+]
+
+
+def expected(path):
+    value = json.loads(DOCUMENT)
+    for step in path:
+        value = value[step]
+    return value
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_extract_walks_path(path):
+    assert extract(DOCUMENT, path) == expected(path)
+    assert extract(DOCUMENT.encode('utf-8'), path) == expected(path)
+
+
+def test_extract_fields():
+    path = ('data', 'timelines', 1, 'intervals', 0, 'values')
+    assert extract(DOCUMENT, path, fields=('temperature', 'missing')) == {'temperature': 2.5e-3}
+
+
+def test_extract_missing_key_and_index():
+    with pytest.raises(KeyError):
+        extract(DOCUMENT, ('data', 'nope'))
+    with pytest.raises(IndexError):
+        extract(DOCUMENT, ('data', 'timelines', 5))
+
+
+def test_extract_truncated_document():
+    with pytest.raises(ValueError):
+        extract(DOCUMENT[:40], ('data', 'timelines', 0))
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_extract_stream_every_split(path):
+    raw = DOCUMENT.encode('utf-8')
+    for split in range(len(raw) + 1):
+        assert extract_stream([raw[:split], raw[split:]], path) == expected(path), split
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_extract_stream_single_bytes(path):
+    raw = DOCUMENT.encode('utf-8')
+    assert extract_stream([raw[i:i + 1] for i in range(len(raw))], path) == expected(path)
+
+
+@pytest.mark.parametrize('chunks, value', [
+    ([b'{"values": -0.', b'5, "z": 1}'], -0.5),
+    ([b'{"values": 2', b'.5e-3}'], 2.5e-3),
+    ([b'{"values": 2.5e', b'-3 }'], 2.5e-3),
+    ([b'{"values": tr', b'ue}'], True),
+    ([b'{"values": 17'], 17),
+])
+def test_extract_stream_numbers_cut_by_chunks(chunks, value):
+    assert extract_stream(chunks, ('values',)) == value
+
+
+def test_extract_stream_multibyte_split():
+    raw = json.dumps({'place': 'Zürich'}, ensure_ascii=False).encode('utf-8')
+    for split in range(len(raw) + 1):
+        assert extract_stream([raw[:split], raw[split:]], ('place',)) == 'Zürich'
+
+
+def test_extract_stream_stops_reading():
+    raw = json.dumps({'first': [1, 2], 'rest': 'x' * 10000}).encode('utf-8')
+    chunks = [raw[i:i + 16] for i in range(0, len(raw), 16)]
+    consumed = []
+
+    def feed():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    assert extract_stream(feed(), ('first',)) == [1, 2]
+    assert len(consumed) < len(chunks)
+
+
+def test_extract_stream_truncated():
+    with pytest.raises(ValueError):
+        extract_stream([b'{"values": [1, 2'], ('values',))
@@ -0,0 +1,40 @@
+import threading
+
+from geocode_cache import GeocodeCache
+from json_store import JSONFile
+
+
+def test_load_missing_or_corrupt(tmp_path):
+    assert JSONFile(str(tmp_path / 'missing.json')).load({}) == {}
+    corrupt = tmp_path / 'corrupt.json'
+    corrupt.write_text('{"half": ', encoding='utf-8')
+    assert JSONFile(str(corrupt)).load([]) == []
+
+
+def test_save_round_trip(tmp_path):
+    store = JSONFile(str(tmp_path / 'nested' / 'data.json'))
+    store.save({'zürich': [47.37, 8.54]})
+    assert JSONFile(store.path).load({}) == {'zürich': [47.37, 8.54]}
+    assert not (tmp_path / 'nested' / 'data.json.tmp').exists()
+
+
+def test_concurrent_saves(tmp_path):
+    # The race bench_e2e found: parallel saves shared one temp file, so os.replace() failed
+    cache = GeocodeCache(str(tmp_path / 'geocode_cache.json'))
+    errors = []
+
+    def add(worker):
+        try:
+            for index in range(50):
+                cache.put(f"place {worker} {index}", worker, index, f"Place {worker} {index}")
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=add, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(GeocodeCache(cache.path)) == 400
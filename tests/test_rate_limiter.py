@@ -0,0 +1,179 @@
+import email.utils
+
+import pytest
+
+from rate_limiter import MAX_BACKOFF, RateLimitedAdapter, RateLimiter, TokenBucket, parse_retry_after
+
+
+class Clock:
+    """Fake monotonic clock whose sleep() just moves time forward."""
+
+    def __init__(self, now=100.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def bucket(rate, burst=1):
+    clock = Clock()
+    return TokenBucket(rate, burst, clock=clock, sleep=clock.sleep), clock
+
+
+def test_requests_are_spaced_at_the_rate():
+    limiter, clock = bucket(2)
+    waits = [limiter.acquire() for _ in range(4)]
+    assert waits == pytest.approx([0, 0.5, 0.5, 0.5])
+    assert clock.now == pytest.approx(101.5)
+
+
+def test_burst_goes_out_at_once():
+    limiter, clock = bucket(1, burst=3)
+    assert [limiter.acquire() for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire() == pytest.approx(1)
+    # An idle bucket refills up to the burst, no further
+    clock.now += 10
+    assert [limiter.acquire() for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire() > 0
+
+
+def test_reserve_does_not_sleep():
+    limiter, clock = bucket(1)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(1)
+    assert clock.sleeps == []
+    stats = limiter.stats()
+    assert stats['acquired'] == 2 and stats['max_wait'] == pytest.approx(1)
+
+
+def test_try_acquire():
+    limiter, clock = bucket(1)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    clock.now += 1
+    assert limiter.try_acquire()
+
+
+def test_throttled_pauses_for_retry_after_and_halves_rate():
+    limiter, clock = bucket(4)
+    limiter.acquire()
+    limiter.throttled(retry_after=3)
+    assert limiter.current_rate == 2
+    assert limiter.acquire() == pytest.approx(3)
+    assert limiter.acquire() == pytest.approx(0.5)
+
+
+def test_throttled_backs_off_exponentially_once_per_pause():
+    limiter, clock = bucket(16)
+    limiter.throttled()
+    # Requests already in flight hit the same pause; they don't slow it down again
+    limiter.throttled()
+    assert limiter.current_rate == 8
+    assert limiter.acquire() == pytest.approx(1)
+    limiter.throttled()
+    assert limiter.current_rate == 4
+    assert limiter.acquire() == pytest.approx(2)
+    for _ in range(10):
+        clock.now += 1000
+        limiter.throttled()
+    assert limiter.current_rate == 1
+    assert limiter._backoff == MAX_BACKOFF
+
+
+def test_rate_recovers_as_requests_succeed():
+    limiter, clock = bucket(10)
+    limiter.throttled()
+    assert limiter.current_rate == 5
+    for _ in range(3):
+        limiter.succeeded()
+    assert limiter.current_rate == 8
+    for _ in range(5):
+        limiter.succeeded()
+    assert limiter.current_rate == 10
+    assert limiter._backoff == 1.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('-5') == 0
+    assert parse_retry_after('soon') is None
+    date = email.utils.formatdate(1000.0 + 30, usegmt=True)
+    assert parse_retry_after(date, now=1000.0) == pytest.approx(30)
+    assert parse_retry_after(date, now=2000.0) == 0
+
+
+def test_limiter_keeps_the_stricter_limit():
+    limiter = RateLimiter()
+    limiter.limit('api.example', 3)
+    limiter.limit('api.example', 10)
+    assert limiter.bucket('api.example').rate == 3
+    limiter.limit('api.example', 1)
+    assert limiter.bucket('api.example').rate == 1
+    limiter.limit('other.example', 0)
+    assert limiter.bucket('other.example').rate == float('inf')
+    assert limiter.bucket('unknown.example') is None
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b''
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Adapter:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request)
+        status = self.statuses.pop(0)
+        return Response(status, {'Retry-After': '2'} if status == 429 else {})
+
+
+class Request:
+    url = 'https://api.example/v4/weather/forecast?location=1,2'
+
+
+def adapter_for(statuses, retries=5):
+    clock = Clock()
+    limiter = RateLimiter()
+    limiter._buckets['api.example'] = TokenBucket(10, clock=clock, sleep=clock.sleep)
+    return RateLimitedAdapter(Adapter(statuses), limiter, retries=retries), clock
+
+
+def test_adapter_retries_429_through_the_bucket():
+    adapter, clock = adapter_for([429, 429, 200])
+    response = adapter.send(Request())
+    assert response.status_code == 200
+    assert len(adapter.adapter.sent) == 3
+    # Each retry waited out Retry-After
+    assert sum(clock.sleeps) == pytest.approx(4, abs=0.2)
+
+
+def test_adapter_gives_up_after_retries():
+    adapter, clock = adapter_for([429, 429, 429], retries=2)
+    assert adapter.send(Request()).status_code == 429
+    assert len(adapter.adapter.sent) == 3
+
+
+def test_adapter_passes_other_hosts_through():
+    adapter, clock = adapter_for([200])
+
+    class Other:
+        url = 'https://other.example/'
+
+    assert adapter.send(Other()).status_code == 200
+    assert clock.sleeps == []
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+import refresh_scheduler
+from refresh_scheduler import RefreshScheduler
+from weather_cache import ForecastCache, LastKnownStore
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    """Stand-ins for geocoding and the forecast API; returns the list of refreshed coordinates."""
+    calls = []
+    cache = ForecastCache(ttl=300, clock=time.monotonic)
+
+    def refresh_forecast(lat, lon, timesteps=None):
+        calls.append((lat, lon))
+        data = {'timelines': {'minutely': [{'values': {'temperature': 10.0}}]}}
+        cache.put(lat, lon, data, timesteps)
+        return data
+
+    def geocode(location):
+        if location == 'Nowhere':
+            return None, None, None
+        return 42.36, -71.06, f"{location}, US"
+
+    monkeypatch.setattr(refresh_scheduler, 'refresh_forecast', refresh_forecast)
+    monkeypatch.setattr(refresh_scheduler, 'geocode', geocode)
+    monkeypatch.setattr(refresh_scheduler, 'forecast_cache', cache)
+    monkeypatch.setattr(refresh_scheduler, 'last_known', LastKnownStore(str(tmp_path / 'last_known.json')))
+    return calls
+
+
+def refresh(scheduler, location):
+    # _refresh hands back the slot _run took for it
+    scheduler._slots.acquire()
+    scheduler._refresh(location)
+
+
+def test_next_due_falls_in_the_jitter_window():
+    scheduler = RefreshScheduler(ttl=300, jitter=0.2)
+    for _ in range(100):
+        assert 100 + 300 - 60 <= scheduler.next_due(100) <= 100 + 300 - 30
+
+
+def test_budget_sets_the_interval():
+    scheduler = RefreshScheduler(['Boston', 'Paris'], ttl=300, budget=60, jitter=0.2)
+    assert scheduler.interval == 60
+    stats = scheduler.stats()
+    assert stats['locations'] == 2
+    assert stats['needed_per_hour'] == pytest.approx(2 * 12 / 0.85)
+    assert stats['budget_per_hour'] == 60
+
+
+def test_refreshes_are_paced_by_the_budget(upstream):
+    done = threading.Semaphore(0)
+    started = []
+
+    def on_refresh(location, address, current):
+        started.append(time.monotonic())
+        done.release()
+
+    # 36000 calls per hour is one every 0.1 s
+    scheduler = RefreshScheduler(['1,1', '2,2', '3,3'], ttl=300, budget=36000, max_concurrent=3,
+                                 on_refresh=on_refresh)
+    scheduler.start()
+    try:
+        for _ in range(3):
+            assert done.acquire(timeout=5)
+    finally:
+        scheduler.stop(wait=True)
+
+    assert sorted(upstream) == [(1.0, 1.0), (2.0, 2.0), (3.0, 3.0)]
+    gaps = [later - earlier for earlier, later in zip(started, started[1:])]
+    assert all(gap >= 0.09 for gap in gaps)
+    assert scheduler.stats()['refreshed'] == 3
+
+
+def test_refresh_reschedules_within_the_ttl(upstream):
+    clock = Clock()
+    refreshed = []
+    scheduler = RefreshScheduler(ttl=300, jitter=0.2, clock=clock,
+                                 on_refresh=lambda *args: refreshed.append(args))
+    scheduler._locations.add('Boston')
+    refresh(scheduler, 'Boston')
+
+    assert upstream == [(42.36, -71.06)]
+    assert refreshed == [('Boston', 'Boston, US', {'temperature': 10.0})]
+    assert refresh_scheduler.last_known.get('Boston')[0] == 'Boston, US'
+    due, _, location = scheduler._queue[0]
+    assert location == 'Boston'
+    assert clock.now + 240 <= due <= clock.now + 270
+
+
+def test_entry_renewed_elsewhere_is_skipped(upstream, monkeypatch):
+    clock = Clock()
+    cache = ForecastCache(ttl=300, clock=clock)
+    monkeypatch.setattr(refresh_scheduler, 'forecast_cache', cache)
+    cache.put(42.36, -71.06, {}, refresh_scheduler.CURRENT_TIMESTEPS)
+    clock.now += 10
+
+    scheduler = RefreshScheduler(ttl=300, budget=60, jitter=0.2, clock=clock)
+    scheduler._locations.add('Boston')
+    refresh(scheduler, 'Boston')
+
+    assert upstream == []
+    assert scheduler.stats()['skipped'] == 1
+    due = scheduler._queue[0][0]
+    assert clock.now - 10 + 240 <= due <= clock.now - 10 + 270
+
+
+def test_failures_wait_a_full_ttl(upstream):
+    clock = Clock()
+    errors = []
+    scheduler = RefreshScheduler(ttl=300, clock=clock, on_error=lambda *args: errors.append(args))
+    scheduler._locations.add('Nowhere')
+    refresh(scheduler, 'Nowhere')
+
+    assert [location for location, _ in errors] == ['Nowhere']
+    assert scheduler.stats()['failed'] == 1
+    assert [(due, location) for due, _, location in scheduler._queue] == [(clock.now + 300, 'Nowhere')]
+
+
+def test_removed_locations_are_not_rescheduled(upstream):
+    scheduler = RefreshScheduler(['Boston'], ttl=300, clock=Clock())
+    scheduler._queue.clear()
+    scheduler.remove('Boston')
+    refresh(scheduler, 'Boston')
+
+    assert scheduler.stats()['refreshed'] == 1
+    assert scheduler._queue == []
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_followers(flight, key, fn, count):
+    """Start ``count`` callers for ``key`` once the leader is running ``fn``; return their threads and results."""
+    results = [None] * count
+
+    def follow(index):
+        try:
+            results[index] = flight.do(key, fn)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=follow, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for_waiters(flight, count):
+    # Followers count themselves as coalesced just before they wait
+    deadline = time.monotonic() + 5
+    while flight.stats()['coalesced'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'temperature': 1}
+
+    leader = threading.Thread(target=flight.do, args=('boston', fetch))
+    leader.start()
+    assert started.wait(5)
+    assert flight.in_flight() == 1
+
+    threads, results = run_followers(flight, 'boston', fetch, 4)
+    wait_for_waiters(flight, 4)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == [{'temperature': 1}] * 4
+    assert flight.stats() == {'in_flight': 0, 'executed': 1, 'coalesced': 4}
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    error = ConnectionError('upstream down')
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise error
+
+    leader_error = []
+
+    def lead():
+        try:
+            flight.do('boston', fetch)
+        except ConnectionError as e:
+            leader_error.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert started.wait(5)
+
+    threads, results = run_followers(flight, 'boston', fetch, 2)
+    wait_for_waiters(flight, 2)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join(5)
+
+    assert leader_error == [error]
+    assert results == [error, error]
+    assert flight.in_flight() == 0
+
+
+def test_finished_calls_are_not_reused():
+    flight = SingleFlight()
+    assert flight.do('boston', lambda: 1) == 1
+    assert flight.do('boston', lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do('boston', int, 'not a number')
+    assert flight.stats() == {'in_flight': 0, 'executed': 3, 'coalesced': 0}
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+import weather_api
+from rate_limiter import RateLimited, RateLimitedAdapter, RateLimiter, TokenBucket, without_queueing
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Response:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Adapter:
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        return Response()
+
+
+class Request:
+    url = 'https://nominatim.example/search?q=bos'
+
+
+def test_without_queueing_refuses_busy_slot():
+    limiter = RateLimiter()
+    limiter.limit('nominatim.example', 1)
+    clock = Clock()
+    limiter._buckets['nominatim.example'] = TokenBucket(1, clock=clock, sleep=pytest.fail)
+    adapter = RateLimitedAdapter(Adapter(), limiter)
+
+    with without_queueing():
+        adapter.send(Request())
+        with pytest.raises(RateLimited):
+            adapter.send(Request())
+        clock.now += 1
+        adapter.send(Request())
+    assert adapter.adapter.sent == 2
+
+
+def test_suggest_place_does_not_cache(monkeypatch):
+    class Geolocator:
+        def geocode(self, text):
+            return type('Location', (), {'latitude': 42.36, 'longitude': -71.06, 'address': 'Boston'})()
+
+    monkeypatch.setattr(weather_api, 'get_geolocator', Geolocator)
+    monkeypatch.setattr(weather_api, 'offline_geocoder', None)
+    monkeypatch.setattr(weather_api, 'GEOCODER_OFFLINE_ONLY', False)
+
+    assert weather_api.suggest_place('Bos') == (42.36, -71.06, 'Boston')
+    assert 'Bos' not in weather_api.geocode_cache
+
+
+def test_suggest_place_cancelled(monkeypatch):
+    monkeypatch.setattr(weather_api, 'get_geolocator', lambda: pytest.fail("request sent"))
+    monkeypatch.setattr(weather_api, 'offline_geocoder', None)
+    monkeypatch.setattr(weather_api, 'GEOCODER_OFFLINE_ONLY', False)
+    cancelled = threading.Event()
+    cancelled.set()
+    assert weather_api.suggest_place('Bos', cancelled) == (None, None, None)
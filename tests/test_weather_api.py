@@ -0,0 +1,84 @@
+import pytest
+
+import weather_api
+from weather_cache import ForecastCache, LastKnownStore
+
+BOSTON = (42.3478, -71.0466, 'Boston, MA')
+
+
+def payload(temperature):
+    return {'timelines': {'minutely': [{'time': '2024-01-01T00:00:00Z', 'values': {'temperature': temperature}}]}}
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(weather_api, 'forecast_cache', ForecastCache(clock=clock))
+    monkeypatch.setattr(weather_api, 'last_known', LastKnownStore(str(tmp_path / 'last_known.json'), clock=clock))
+    return clock
+
+
+def test_lookup_current_reports_age_of_cached_forecast(clock):
+    weather_api.forecast_cache.put(42.3478, -71.0466, payload(3), weather_api.CURRENT_TIMESTEPS)
+    clock.now += 240
+
+    address, current, fetched_at, stale = weather_api.lookup_current('Boston', place=BOSTON)
+    assert (address, current, stale) == ('Boston, MA', {'temperature': 3}, False)
+    assert fetched_at == 1000.0
+    assert weather_api.last_known.get('Boston')[2] == 1000.0
+
+
+def test_lookup_current_age_from_full_payload(clock):
+    weather_api.forecast_cache.put(42.3478, -71.0466, payload(3))
+    clock.now += 60
+    assert weather_api.lookup_current('Boston', place=BOSTON)[2] == 1000.0
+
+
+def test_lookup_current_falls_back_to_last_known_at_deadline(clock, monkeypatch):
+    def too_slow(lat, lon, timesteps=None, deadline=None):
+        raise weather_api.DeadlineExceeded(deadline.budget)
+
+    monkeypatch.setattr(weather_api, 'fetch_forecast', too_slow)
+    with pytest.raises(weather_api.DeadlineExceeded):
+        weather_api.lookup_current('Boston', place=BOSTON)
+
+    weather_api.last_known.put('Boston', 'Boston, MA', {'temperature': 3}, age=120)
+    assert weather_api.lookup_current('Boston', place=BOSTON) == ('Boston, MA', {'temperature': 3}, 880.0, True)
+
+
+class Recorder:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args[0])
+
+
+def test_preconnect_only_when_nominatim_is_asked(monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(weather_api, 'get_executor', lambda: recorder)
+    monkeypatch.setattr(weather_api, '_geocode_upstream', lambda location: BOSTON)
+    monkeypatch.setattr(weather_api, 'GEOCODER_OFFLINE_ONLY', False)
+
+    class Gazetteer:
+        def geocode(self, location):
+            return (1.0, 2.0, 'Known') if location == 'Known' else (None, None, None)
+
+    monkeypatch.setattr(weather_api, 'offline_geocoder', Gazetteer())
+    assert weather_api.geocode('Known', preconnect_to='https://api.example/') == (1.0, 2.0, 'Known')
+    assert recorder.submitted == []
+
+    assert weather_api.geocode('Boston', preconnect_to='https://api.example/') == BOSTON
+    assert recorder.submitted == ['https://api.example/']
+
+    # Coordinates need neither
+    assert weather_api._locate('1.5,2.5', None) == (1.5, 2.5, '1.5,2.5')
+    assert len(recorder.submitted) == 1
@@ -0,0 +1,93 @@
+from weather_cache import ForecastCache, LastKnownStore, format_age, last_known_key
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_forecast_cache_expires_after_ttl():
+    clock = Clock()
+    cache = ForecastCache(ttl=60, clock=clock)
+    cache.put(42.3478, -71.0466, {'temperature': 1})
+
+    clock.now = 60.0
+    assert cache.get(42.3478, -71.0466) == {'temperature': 1}
+    assert cache.age(42.3478, -71.0466) == 60.0
+    clock.now = 60.5
+    assert cache.get(42.3478, -71.0466) is None
+    assert len(cache) == 0
+    assert cache.stats() == {'entries': 0, 'hits': 1, 'misses': 1, 'evictions': 0}
+
+
+def test_forecast_cache_evicts_least_recently_used():
+    cache = ForecastCache(max_entries=2, clock=Clock())
+    cache.put(1, 1, 'a')
+    cache.put(2, 2, 'b')
+    assert cache.get(1, 1) == 'a'
+    cache.put(3, 3, 'c')
+
+    assert cache.get(2, 2) is None
+    assert cache.get(1, 1) == 'a'
+    assert cache.get(3, 3) == 'c'
+    assert cache.stats() == {'entries': 2, 'hits': 3, 'misses': 1, 'evictions': 1}
+
+
+def test_forecast_cache_peek_leaves_counters_and_order_alone():
+    clock = Clock()
+    cache = ForecastCache(ttl=60, max_entries=2, clock=clock)
+    cache.put(1, 1, 'a')
+    cache.put(2, 2, 'b')
+    assert cache.peek(1, 1) == 'a'
+    assert cache.peek(9, 9) is None
+    cache.put(3, 3, 'c')
+
+    assert cache.peek(1, 1) is None
+    assert cache.peek(2, 2) == 'b'
+    assert cache.stats() == {'entries': 2, 'hits': 0, 'misses': 0, 'evictions': 1}
+    clock.now = 61.0
+    assert cache.peek(2, 2) is None
+
+
+def test_forecast_cache_keys():
+    cache = ForecastCache(precision=2, clock=Clock())
+    cache.put(42.3478, -71.0466, 'full')
+    cache.put(42.3478, -71.0466, 'current', timesteps='1m')
+
+    assert cache.get(42.3481, -71.0462) == 'full'
+    assert cache.get('42.35', '-71.05', timesteps='1m') == 'current'
+    assert cache.get(42.3478, -71.0466, timesteps='1h') is None
+
+
+def test_last_known_keys_keep_coordinate_signs(tmp_path):
+    store = LastKnownStore(str(tmp_path / 'last_known.json'), clock=lambda: 100.0)
+    store.put('42.3478,-71.0466', '42.3478,-71.0466', {'temperature': 1})
+    store.put('-42.3478,71.0466', '-42.3478,71.0466', {'temperature': 20})
+
+    assert store.get('42.3478,-71.0466')[1] == {'temperature': 1}
+    assert store.get(' 42.34780, -71.0466 ')[1] == {'temperature': 1}
+    assert store.get('-42.3478,71.0466')[1] == {'temperature': 20}
+    assert store.get('42.3478,71.0466') is None
+    assert store.get('-42.3478,-71.0466') is None
+
+
+def test_last_known_place_names_are_normalized(tmp_path):
+    store = LastKnownStore(str(tmp_path / 'last_known.json'), clock=lambda: 100.0)
+    store.put('New York, NY', 'New York', {'temperature': 5})
+    assert store.get(' new york ny ') == ('New York', {'temperature': 5}, 100.0)
+    assert LastKnownStore(store.path).get('New York, NY')[0] == 'New York'
+
+
+def test_last_known_key():
+    assert last_known_key('42.34781,-71.04662') == '42.3478,-71.0466'
+    assert last_known_key('Boston, MA') == 'boston ma'
+
+
+def test_format_age():
+    assert format_age(5) == "just now"
+    assert format_age(300) == "5 min ago"
+    assert format_age(7200) == "2 h ago"
+    assert format_age(86400) == "1 day ago"
@@ -0,0 +1,213 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# ... and in bytes, for response sizes
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Write the histograms here when the process exits (.json for JSON, otherwise Prometheus text)
+TIMINGS_EXPORT = os.getenv('TIMINGS_EXPORT')
+
+_local = threading.local()
+_histograms = {}
+_size_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative distribution of one phase's durations (or of sizes, with SIZE_BUCKETS)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'max': self.max, 'buckets': buckets}
+
+    def quantile(self, q):
+        """Estimate the q-quantile (0-1), interpolating within the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative, lower = 0, 0.0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            if count and cumulative + count >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.max
+
+
+class Trace:
+    """The spans recorded during one lookup, as (phase, seconds) in order.
+
+    ``sizes`` holds the bytes received during the lookup, per kind of response.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self.sizes = {}
+
+    def add(self, name, seconds):
+        self.spans.append((name, seconds))
+
+    def add_size(self, name, nbytes):
+        self.sizes[name] = self.sizes.get(name, 0) + nbytes
+
+    @contextmanager
+    def span(self, name):
+        """Time a phase into this trace from any thread (e.g. Tk updates after a lookup)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record(name, time.perf_counter() - start, self)
+
+    def phases(self):
+        """Total seconds per phase, in the order each phase first appeared."""
+        totals = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def summary(self):
+        parts = [f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases().items()]
+        parts += [f"{name} {nbytes / 1024:.1f} KiB" for name, nbytes in self.sizes.items()]
+        return " · ".join(parts)
+
+
+def record(name, seconds, trace=None):
+    """Add a duration to the phase's histogram and to the trace (default: this thread's)."""
+    with _histograms_lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    if trace is None:
+        trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def record_size(name, nbytes, trace=None):
+    """Add a size in bytes (e.g. of a response on the wire) to its histogram and the trace."""
+    with _histograms_lock:
+        histogram = _size_histograms.get(name)
+        if histogram is None:
+            histogram = _size_histograms[name] = Histogram(SIZE_BUCKETS)
+        histogram.observe(nbytes)
+
+    if trace is None:
+        trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add_size(name, nbytes)
+
+
+@contextmanager
+def span(name):
+    """Time a phase of the current lookup."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace():
+    """Collect the spans recorded on this thread into a new Trace."""
+    with attach(Trace()) as current:
+        yield current
+
+
+@contextmanager
+def attach(current):
+    """Collect this thread's spans into an existing Trace, e.g. one started on another thread."""
+    previous = getattr(_local, 'trace', None)
+    _local.trace = current
+    try:
+        yield current
+    finally:
+        _local.trace = previous
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+def histograms():
+    with _histograms_lock:
+        return {name: histogram.to_dict() for name, histogram in _histograms.items()}
+
+
+def size_histograms():
+    with _histograms_lock:
+        return {name: histogram.to_dict() for name, histogram in _size_histograms.items()}
+
+
+def _prometheus_histogram(lines, metric, label, description, histograms):
+    lines.append(f"# HELP {metric} {description}")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, histogram in sorted(histograms.items()):
+        for bound, count in histogram['buckets'].items():
+            lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {count}')
+        lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram["sum"]:.6f}')
+        lines.append(f'{metric}_count{{{label}="{name}"}} {histogram["count"]}')
+
+
+def to_prometheus():
+    lines = []
+    _prometheus_histogram(lines, 'weather_phase_seconds', 'phase',
+                          "Time spent in each phase of a weather lookup.", histograms())
+    _prometheus_histogram(lines, 'weather_response_bytes', 'kind',
+                          "Bytes received on the wire per response.", size_histograms())
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    """Write the histograms to ``path``: JSON if it ends in .json, else Prometheus text."""
+    if path.endswith('.json'):
+        text = json.dumps({'seconds': histograms(), 'bytes': size_histograms()}, indent=2)
+    else:
+        text = to_prometheus()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+if TIMINGS_EXPORT:
+    atexit.register(export, TIMINGS_EXPORT)
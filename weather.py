@@ -1,78 +1,159 @@
 #!/usr/bin/env python3
-import os
 import click
-import requests
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from classifier import classify_timeline, labels
+import timings
+from weather_api import (
+    API_KEY, CURRENT_TIMESTEPS, HOURLY_TIMESTEPS,
+    fetch_forecast, fetch_current, get_forecast, parse_location, parse_weather,
+    summarize_conditions, get_weather_description
+)
 
-# Load environment variables
-load_dotenv()
+# Timelines for the hourly outlook: the current step plus the hourly steps
+OUTLOOK_TIMESTEPS = f"{CURRENT_TIMESTEPS},{HOURLY_TIMESTEPS}"
 
-# Get API key from environment variable
-API_KEY = os.getenv('TOMORROW_API_KEY')
-BASE_URL = "https://api.tomorrow.io/v4/weather/forecast"
+def get_weather(location, current_only=False):
+    """Get weather data for a location (latitude,longitude).
 
-def get_weather(location):
-    """Get weather data for a location (latitude,longitude)."""
+    With current_only the response is streamed and only the current
+    conditions are decoded; the payload is not cached. Otherwise the
+    minutely and hourly timelines are fetched and cached for the outlook.
+    """
     if not API_KEY:
         raise click.ClickException("Please set your Tomorrow.io API key in the .env file")
 
     try:
-        lat, lon = map(float, location.split(','))
+        lat, lon = parse_location(location)
     except ValueError:
         raise click.ClickException("Location must be in format: latitude,longitude (e.g., 42.3478,-71.0466)")
 
-    params = {
-        'location': f"{lat},{lon}",
-        'apikey': API_KEY
-    }
-
+    # Imported only once there is something to fetch, so --help and usage errors print quickly
+    import requests
     try:
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        # Extract current conditions from the first timestep
-        current = data['timelines']['minutely'][0]['values']
-        
-        weather = {
-            'temperature': round(current['temperature'], 1),
-            'description': get_weather_description(current),
-            'humidity': round(current['humidity'], 1),
-            'wind_speed': round(current['windSpeed'], 1),
-            'precipitation': round(current['precipitationProbability'], 1),
-            'cloud_cover': round(current['cloudCover'], 1)
-        }
-        return weather
+        if current_only:
+            return summarize_conditions(fetch_current(lat, lon))
+        data = fetch_forecast(lat, lon, OUTLOOK_TIMESTEPS)
+        return parse_weather(data)
 
     except requests.exceptions.RequestException as e:
         raise click.ClickException(f"Error fetching weather data: {str(e)}")
 
-def get_weather_description(conditions):
-    """Generate a weather description based on conditions."""
-    if conditions['precipitationProbability'] > 50:
-        if conditions['temperature'] <= 0:
-            return "Snowy"
-        return "Rainy"
-    elif conditions['cloudCover'] > 70:
-        return "Cloudy"
-    elif conditions['cloudCover'] > 30:
-        return "Partly cloudy"
+def read_batch_locations(lines):
+    """Yield (line_number, location) pairs, skipping blank lines and # comments."""
+    for line_number, line in enumerate(lines, start=1):
+        location = line.strip()
+        if location and not location.startswith('#'):
+            yield line_number, location
+
+def format_batch_result(weather_data, fahrenheit):
+    """Format weather data as a single line for batch output."""
+    temp = weather_data['temperature']
+    if fahrenheit:
+        temp = f"{(temp * 9/5) + 32:.1f}°F"
     else:
-        return "Clear"
+        temp = f"{temp}°C"
+    return (f"{temp}, {weather_data['description']}, "
+            f"humidity {weather_data['humidity']}%, "
+            f"wind {weather_data['wind_speed']} m/s, "
+            f"precipitation {weather_data['precipitation']}%, "
+            f"cloud cover {weather_data['cloud_cover']}%")
+
+def run_batch(lines, fahrenheit, concurrency):
+    """Fetch many locations on a bounded worker pool, printing each result as it arrives."""
+    failures = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(get_weather, location, current_only=True): (line_number, location)
+            for line_number, location in read_batch_locations(lines)
+        }
+        for future in as_completed(futures):
+            line_number, location = futures[future]
+            try:
+                weather_data = future.result()
+            except Exception as e:
+                failures += 1
+                click.echo(f"line {line_number} ({location}): Error: {str(e)}", err=True)
+                continue
+            click.echo(f"line {line_number} ({location}): {format_batch_result(weather_data, fahrenheit)}")
+    return failures
+
+def print_trace(trace):
+    """Print how long each phase of a single lookup took."""
+    click.echo("\nTimings:")
+    click.echo("------------------------")
+    for name, seconds in trace.phases().items():
+        click.echo(f"{name:<10}{seconds * 1000:>9.1f} ms")
+    for name, nbytes in trace.sizes.items():
+        click.echo(f"{name:<10}{nbytes / 1024:>9.1f} KiB")
+
+def print_histograms():
+    """Print per-phase totals across every lookup in a batch."""
+    click.echo("\nTimings:", err=True)
+    click.echo(f"{'phase':<10}{'count':>7}{'avg':>12}{'max':>12}", err=True)
+    for name, histogram in timings.histograms().items():
+        avg = histogram['sum'] / histogram['count'] * 1000
+        click.echo(f"{name:<10}{histogram['count']:>7}{avg:>9.1f} ms{histogram['max'] * 1000:>9.1f} ms", err=True)
+    for name, histogram in timings.size_histograms().items():
+        avg = histogram['sum'] / histogram['count'] / 1024
+        click.echo(f"{name:<10}{histogram['count']:>7}{avg:>8.1f} KiB{histogram['max'] / 1024:>8.1f} KiB", err=True)
+
+def print_hourly(location, hours, fahrenheit):
+    """Print the hourly outlook from the (already cached) forecast payload."""
+    hourly = get_forecast(*parse_location(location), OUTLOOK_TIMESTEPS).hourly
+    if hourly is None:
+        return
+
+    click.echo(f"\nNext {hours} hours:")
+    click.echo("------------------------")
+    hourly = hourly.head(hours)
+    descriptions = labels(classify_timeline(hourly))
+    for (when, values), description in zip(hourly.rows(), descriptions):
+        temp = values['temperature']
+        if fahrenheit:
+            temp = f"{(temp * 9/5) + 32:.1f}°F"
+        else:
+            temp = f"{temp:.1f}°C"
+        click.echo(f"{when.astimezone():%a %H:%M}  {temp:>7}  {description}")
 
 @click.command()
-@click.argument('location')
+@click.argument('location', required=False)
 @click.option('--celsius', '-c', is_flag=True, help='Show temperature in Celsius (default)')
 @click.option('--fahrenheit', '-f', is_flag=True, help='Show temperature in Fahrenheit')
-def main(location, celsius, fahrenheit):
+@click.option('--batch', '-b', type=click.File('r'), help='Read latitude,longitude lines from a file ("-" for stdin)')
+@click.option('--concurrency', '-j', type=click.IntRange(min=1), default=8, show_default=True,
+              help='Maximum number of requests in flight in batch mode')
+@click.option('--hours', type=click.IntRange(min=0), default=0, help='Also show the hourly outlook for this many hours')
+@click.option('--timings', 'show_timings', is_flag=True, help='Show how long each phase of the lookup took')
+@click.option('--timings-file', type=click.Path(dir_okay=False, writable=True),
+              help='Write per-phase histograms to this file (.json for JSON, otherwise Prometheus text)')
+def main(location, celsius, fahrenheit, batch, concurrency, hours, show_timings, timings_file):
     """
     Get current weather information for a LOCATION (latitude,longitude).
     
     Example: python weather.py "42.3478,-71.0466"
+
+    Batch example: python weather.py --batch sites.txt -j 16
     """
+    if batch is not None:
+        if location:
+            raise click.UsageError("Pass either a LOCATION or --batch, not both")
+        failures = run_batch(batch, fahrenheit, concurrency)
+        if show_timings:
+            print_histograms()
+        if timings_file:
+            timings.export(timings_file)
+        if failures:
+            raise SystemExit(1)
+        return
+
+    if not location:
+        raise click.UsageError("Missing LOCATION (or use --batch)")
+
     try:
-        weather_data = get_weather(location)
+        # The full payload is only needed for the hourly outlook
+        with timings.trace() as trace, timings.span('lookup'):
+            weather_data = get_weather(location, current_only=not hours)
         
         # Display the weather information
         click.echo(f"\nWeather for location {location}:")
@@ -90,9 +171,18 @@ def main(location, celsius, fahrenheit):
         click.echo(f"Wind Speed: {weather_data['wind_speed']} m/s")
         click.echo(f"Precipitation Probability: {weather_data['precipitation']}%")
         click.echo(f"Cloud Cover: {weather_data['cloud_cover']}%")
+
+        if hours:
+            print_hourly(location, hours, fahrenheit)
+
+        if show_timings:
+            print_trace(trace)
         
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
 
+    if timings_file:
+        timings.export(timings_file)
+
 if __name__ == '__main__':
     main()
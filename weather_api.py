@@ -0,0 +1,375 @@
+import os
+from functools import partial
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from weather_cache import ForecastCache, LastKnownStore
+from geocode_cache import GeocodeCache, DEFAULT_PATH, normalize_query
+from http_session import get_session, preconnect, REQUEST_TIMEOUT
+from single_flight import SingleFlight
+from deadline import Deadline, DeadlineExceeded, Hedger, get_executor
+from offline_geocoder import OfflineGeocoder
+from forecast_model import Forecast
+from json_select import extract_stream
+from classifier import LABELS, classify_one
+from timings import attach, current_trace, span, timed, record_size
+from rate_limiter import (
+    rate_limiter, limit_session, on_dequeue, without_queueing, TOMORROW_RATE_LIMIT, TOMORROW_RATE_BURST,
+    NOMINATIM_RATE_LIMIT
+)
+
+# Load environment variables
+load_dotenv()
+
+# Get API key from environment variable
+API_KEY = os.getenv('TOMORROW_API_KEY')
+BASE_URL = os.getenv('TOMORROW_BASE_URL', "https://api.tomorrow.io/v4/weather/forecast")
+
+# Forecasts only change every few minutes, so repeat lookups are served from memory
+forecast_cache = ForecastCache(
+    ttl=float(os.getenv('FORECAST_CACHE_TTL', '300')),
+    max_entries=int(os.getenv('FORECAST_CACHE_SIZE', '256')),
+    precision=int(os.getenv('FORECAST_CACHE_PRECISION', '2'))
+)
+
+# Current conditions pulled out of a response without decoding the rest of it
+current_cache = ForecastCache(
+    ttl=forecast_cache.ttl,
+    max_entries=forecast_cache.max_entries,
+    precision=forecast_cache.precision
+)
+CURRENT_PATH = ('timelines', 'minutely', 0, 'values')
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Tomorrow.io timesteps to request for each kind of lookup, instead of every timeline
+CURRENT_TIMESTEPS = '1m'
+HOURLY_TIMESTEPS = '1h'
+
+# Last result per searched place, shown instantly while the GUIs revalidate
+last_known = LastKnownStore(os.getenv(
+    'LAST_KNOWN_PATH',
+    os.path.join(os.path.dirname(DEFAULT_PATH), 'last_known.json')
+))
+
+# Geocoding results are persisted to disk so repeat place names skip Nominatim
+geocode_cache = GeocodeCache(os.getenv('GEOCODE_CACHE_PATH', DEFAULT_PATH))
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', "https://nominatim.openstreetmap.org")
+USER_AGENT = "weather_app"
+
+# Per-host request quotas; requests over them wait their turn instead of failing
+rate_limiter.limit(urlsplit(BASE_URL).netloc, TOMORROW_RATE_LIMIT, TOMORROW_RATE_BURST)
+rate_limiter.limit(urlsplit(NOMINATIM_URL).netloc, NOMINATIM_RATE_LIMIT)
+
+_geolocator = None
+
+def get_geolocator():
+    """Create the Nominatim client on first use, since importing geopy is slow."""
+    global _geolocator
+    if _geolocator is None:
+        from geopy.geocoders import Nominatim
+        _geolocator = Nominatim(
+            user_agent=USER_AGENT,
+            domain=urlsplit(NOMINATIM_URL).netloc,
+            scheme=urlsplit(NOMINATIM_URL).scheme,
+            timeout=REQUEST_TIMEOUT[1]
+        )
+        # geopy makes its requests through its own session
+        session = getattr(_geolocator.adapter, 'session', None)
+        if session is not None:
+            limit_session(session, rate_limiter)
+    return _geolocator
+
+# Optional local gazetteer index (see offline_geocoder.py) consulted before Nominatim
+GAZETTEER_INDEX = os.getenv('GAZETTEER_INDEX')
+GEOCODER_OFFLINE_ONLY = os.getenv('GEOCODER_OFFLINE_ONLY', '').lower() in ('1', 'true', 'yes')
+offline_geocoder = None
+if GAZETTEER_INDEX and os.path.exists(GAZETTEER_INDEX):
+    offline_geocoder = OfflineGeocoder(GAZETTEER_INDEX)
+
+# Concurrent lookups for the same place share one upstream request
+forecast_flight = SingleFlight()
+geocode_flight = SingleFlight()
+
+# Total time a lookup_current() may take before it falls back to the last known result
+LOOKUP_DEADLINE = float(os.getenv('LOOKUP_DEADLINE', '8'))
+# Requests made under a deadline are hedged once they run past their usual p95, timed from
+# when they leave the rate limiter's queue
+forecast_hedger = Hedger(queue_hook=on_dequeue)
+geocode_hedger = Hedger(queue_hook=on_dequeue)
+
+def warm_up():
+    """Load the HTTP and geocoding clients ahead of the first lookup.
+
+    The GUIs call this on a worker thread once their window is showing, so
+    startup doesn't wait for these imports and neither does the first search.
+    """
+    get_session()
+    if not GEOCODER_OFFLINE_ONLY:
+        get_geolocator()
+
+@timed('geocode')
+def geocode(location, deadline=None, preconnect_to=None):
+    """Get (latitude, longitude, address) for a place name, using the cache when possible.
+
+    With a ``deadline`` a Nominatim request is hedged when slow, and
+    DeadlineExceeded is raised if there is no answer in time. If Nominatim
+    has to be asked, a connection to the ``preconnect_to`` URL is opened in
+    the background meanwhile, so a request that follows starts warm.
+    """
+    cached = geocode_cache.get(location)
+    if cached is not None:
+        return cached
+
+    if offline_geocoder is not None:
+        result = offline_geocoder.geocode(location)
+        if result[0] is not None or GEOCODER_OFFLINE_ONLY:
+            return result
+    elif GEOCODER_OFFLINE_ONLY:
+        return None, None, None
+
+    if preconnect_to is not None:
+        get_executor().submit(_preconnect, preconnect_to, current_trace())
+    key = normalize_query(location)
+    if deadline is None:
+        return geocode_flight.do(key, _geocode_upstream, location)
+    return geocode_hedger.call(
+        deadline, partial(geocode_flight.do, key, _geocode_upstream), location, hedge=_geocode_upstream
+    )
+
+def _geocode_upstream(location, timeout=None):
+    if timeout is None:
+        location_data = get_geolocator().geocode(location)
+    else:
+        location_data = get_geolocator().geocode(location, timeout=timeout)
+    if not location_data:
+        return None, None, None
+
+    result = (location_data.latitude, location_data.longitude, location_data.address)
+    geocode_cache.put(location, *result)
+    return result
+
+def suggest_place(text, cancelled=None):
+    """Geocode partly typed text for a suggestion, returning (lat, lon, address).
+
+    Unlike geocode(), the result isn't written to the geocode cache, since
+    the text is often half a name. Nominatim is only asked if it has a
+    request slot free right now; otherwise the lookup fails (geopy reports
+    rate_limiter.RateLimited as a GeocoderServiceError) rather than queueing
+    in front of searches. Nothing is sent once ``cancelled`` is set.
+    """
+    if offline_geocoder is not None:
+        result = offline_geocoder.geocode(text)
+        if result[0] is not None or GEOCODER_OFFLINE_ONLY:
+            return result
+    elif GEOCODER_OFFLINE_ONLY:
+        return None, None, None
+
+    if cancelled is not None and cancelled.is_set():
+        return None, None, None
+    with without_queueing():
+        location_data = get_geolocator().geocode(text)
+    if not location_data:
+        return None, None, None
+    return location_data.latitude, location_data.longitude, location_data.address
+
+@timed('geocode')
+def reverse_geocode(lat, lon):
+    """Get (latitude, longitude, address) of the place nearest to a point."""
+    if offline_geocoder is not None:
+        return offline_geocoder.reverse(lat, lon)
+    if GEOCODER_OFFLINE_ONLY:
+        return lat, lon, f"{lat},{lon}"
+
+    location_data = get_geolocator().reverse((lat, lon))
+    if not location_data:
+        return lat, lon, f"{lat},{lon}"
+    return location_data.latitude, location_data.longitude, location_data.address
+
+def forecast_params(lat, lon, timesteps=None):
+    """Query parameters for a forecast request, limited to some timelines if given."""
+    params = {
+        'location': f"{lat},{lon}",
+        'apikey': API_KEY
+    }
+    if timesteps:
+        params['timesteps'] = timesteps
+    return params
+
+def _cached_forecast(lat, lon, timesteps):
+    # A full payload also answers requests for just some timelines; peek so a miss isn't counted twice
+    data = forecast_cache.get(lat, lon, timesteps)
+    if data is None and timesteps is not None:
+        data = forecast_cache.peek(lat, lon)
+    return data
+
+def fetch_forecast(lat, lon, timesteps=None, deadline=None):
+    """Get the raw forecast payload for a location, using the cache when fresh.
+
+    ``timesteps`` (e.g. CURRENT_TIMESTEPS or HOURLY_TIMESTEPS) asks for only
+    those timelines, which makes the response a fraction of the size.
+    """
+    data = _cached_forecast(lat, lon, timesteps)
+    if data is not None:
+        return data
+
+    return refresh_forecast(lat, lon, timesteps, deadline)
+
+def refresh_forecast(lat, lon, timesteps=None, deadline=None):
+    """Fetch a new forecast payload even if the cached one is still fresh.
+
+    With a ``deadline`` the request is hedged when slow, and
+    DeadlineExceeded is raised if there is no answer in time.
+    """
+    key = forecast_cache.make_key(lat, lon, timesteps)
+    if deadline is None:
+        return forecast_flight.do(key, _fetch_forecast_upstream, lat, lon, timesteps)
+    # The duplicate skips the SingleFlight, which would only hand it the slow request's result
+    return forecast_hedger.call(
+        deadline, partial(forecast_flight.do, key, _fetch_forecast_upstream), lat, lon, timesteps,
+        hedge=_fetch_forecast_upstream, timeout=REQUEST_TIMEOUT
+    )
+
+def _fetch_forecast_upstream(lat, lon, timesteps=None, timeout=REQUEST_TIMEOUT):
+    params = forecast_params(lat, lon, timesteps)
+
+    # Streamed so the time to the response headers and the body are timed separately
+    with span('request'):
+        response = get_session().get(BASE_URL, params=params, timeout=timeout, stream=True)
+    with response:
+        response.raise_for_status()
+        with span('body'):
+            data = response.json()
+        record_size('response', response.raw.tell())
+
+    forecast_cache.put(lat, lon, data, timesteps)
+    return data
+
+def fetch_current(lat, lon):
+    """Get only the current conditions for a location.
+
+    Only the minutely timeline is requested, and the response body is
+    streamed so that just its first step is decoded, which is much cheaper
+    than response.json() (e.g. for batch runs).
+    """
+    data = _cached_forecast(lat, lon, CURRENT_TIMESTEPS)
+    if data is not None:
+        return data['timelines']['minutely'][0]['values']
+
+    current = current_cache.get(lat, lon)
+    if current is not None:
+        return current
+
+    return forecast_flight.do(('current',) + current_cache.make_key(lat, lon), _fetch_current_upstream, lat, lon)
+
+def _fetch_current_upstream(lat, lon):
+    params = forecast_params(lat, lon, CURRENT_TIMESTEPS)
+
+    with span('request'):
+        response = get_session().get(BASE_URL, params=params, timeout=REQUEST_TIMEOUT, stream=True)
+    with response:
+        with span('body'):
+            response.raise_for_status()
+            chunks = response.iter_content(STREAM_CHUNK_SIZE)
+            current = extract_stream(chunks, CURRENT_PATH)
+            # Read the rest without parsing it so the connection can be reused
+            for _ in chunks:
+                pass
+        record_size('response', response.raw.tell())
+
+    current_cache.put(lat, lon, current)
+    return current
+
+def lookup_current(location, deadline=None, place=None):
+    """Geocode a place name and get its current conditions before a deadline.
+
+    Returns (address, current values, fetched_at, stale), or None if the
+    place isn't found. "latitude,longitude" input skips geocoding, as does
+    passing the place's (lat, lon, address) as ``place``, e.g. from a
+    picked suggestion. Geocoding and the forecast each get whatever is
+    left of ``deadline`` (LOOKUP_DEADLINE seconds by default). If it passes
+    first, the last known result for the place is returned with stale set,
+    or DeadlineExceeded is raised when there is none.
+    """
+    if deadline is None:
+        deadline = Deadline(LOOKUP_DEADLINE)
+    try:
+        if place is not None:
+            lat, lon, address = place
+        else:
+            lat, lon, address = _locate(location, deadline)
+        if lat is None or lon is None:
+            return None
+        data = fetch_forecast(lat, lon, CURRENT_TIMESTEPS, deadline)
+    except DeadlineExceeded:
+        cached = last_known.get(location)
+        if cached is None:
+            raise
+        return cached + (True,)
+
+    current = data['timelines']['minutely'][0]['values']
+    # The forecast may have come from the cache, so it can be up to FORECAST_CACHE_TTL old
+    fetched_at = last_known.put(location, address, current, _forecast_age(lat, lon, CURRENT_TIMESTEPS))
+    return address, current, fetched_at, False
+
+def _forecast_age(lat, lon, timesteps):
+    # Mirrors _cached_forecast(): a full payload may have answered
+    age = forecast_cache.age(lat, lon, timesteps)
+    if age is None and timesteps is not None:
+        age = forecast_cache.age(lat, lon)
+    return age or 0.0
+
+def _locate(location, deadline):
+    try:
+        lat, lon = parse_location(location)
+        return lat, lon, f"{lat},{lon}"
+    except ValueError:
+        pass
+
+    # Connect to the forecast API while Nominatim is working, so the second request starts warm
+    return geocode(location, deadline, preconnect_to=BASE_URL)
+
+def _preconnect(url, lookup):
+    # Runs alongside geocoding, so its 'connect' span overlaps the 'geocode' one
+    with attach(lookup):
+        try:
+            preconnect(url)
+        except Exception:
+            # The forecast request itself will report a connection problem
+            pass
+
+def get_forecast(lat, lon, timesteps=None):
+    """Get the minutely/hourly/daily forecast for a location as a columnar Forecast.
+
+    Timelines not covered by ``timesteps`` are None.
+    """
+    return Forecast.from_payload(fetch_forecast(lat, lon, timesteps))
+
+def parse_location(location):
+    """Parse a "latitude,longitude" string, raising ValueError if it is malformed."""
+    lat, lon = map(float, location.split(','))
+    return lat, lon
+
+def parse_weather(data):
+    """Extract the current conditions from a forecast payload."""
+    # Extract current conditions from the first timestep
+    return summarize_conditions(data['timelines']['minutely'][0]['values'])
+
+def summarize_conditions(current):
+    """Round and label one step's values for display."""
+    return {
+        'temperature': round(current['temperature'], 1),
+        'description': get_weather_description(current),
+        'humidity': round(current['humidity'], 1),
+        'wind_speed': round(current['windSpeed'], 1),
+        'precipitation': round(current['precipitationProbability'], 1),
+        'cloud_cover': round(current['cloudCover'], 1)
+    }
+
+def get_weather_description(conditions, thresholds=None):
+    """Generate a weather description based on conditions."""
+    code = classify_one(
+        conditions['precipitationProbability'],
+        conditions['temperature'],
+        conditions['cloudCover'],
+        thresholds
+    )
+    return LABELS[code]
@@ -0,0 +1,181 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+from rate_limiter import RATE_LIMIT_RETRIES, parse_retry_after, rate_limiter
+from timings import record
+from weather_api import (
+    API_KEY, BASE_URL, NOMINATIM_URL, USER_AGENT, CURRENT_TIMESTEPS, GEOCODER_OFFLINE_ONLY,
+    forecast_cache, geocode_cache, offline_geocoder, parse_location, parse_weather
+)
+
+DEFAULT_LIMIT_PER_HOST = 32
+DEFAULT_TIMEOUT = 10
+
+
+class AsyncWeatherClient:
+    """Asyncio counterpart to weather.get_weather() and the GUI geocoding step.
+
+    One client holds one aiohttp session, so any number of lookups can be in
+    flight on a single event loop while at most ``limit_per_host`` connections
+    are open to each upstream host. Results share the forecast and geocoding
+    caches, and the per-host rate limits, with the blocking code paths.
+
+    Example:
+        async with AsyncWeatherClient() as client:
+            weather = await client.get_weather("42.3478,-71.0466")
+    """
+
+    def __init__(self, base_url=BASE_URL, nominatim_url=NOMINATIM_URL, api_key=API_KEY,
+                 limit_per_host=DEFAULT_LIMIT_PER_HOST, timeout=DEFAULT_TIMEOUT):
+        self.base_url = base_url
+        self.nominatim_url = nominatim_url.rstrip('/')
+        self.api_key = api_key
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.session = None
+        # Forecast downloads in flight, so concurrent callers for one spot share a request
+        self._inflight = {}
+        self.coalesced = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT}
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch_forecast(self, lat, lon, timesteps=CURRENT_TIMESTEPS):
+        """Get the raw forecast payload for a location, using the cache when fresh.
+
+        Only the current conditions are needed by default, so only the
+        minutely timeline is requested; pass timesteps=None for all of them.
+        """
+        data = forecast_cache.get(lat, lon, timesteps)
+        if data is not None:
+            return data
+
+        key = forecast_cache.make_key(lat, lon, timesteps)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._fetch_forecast_upstream(lat, lon, timesteps))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield the shared task so one cancelled caller doesn't cancel it for everyone
+        return await asyncio.shield(task)
+
+    async def _fetch_forecast_upstream(self, lat, lon, timesteps=None):
+        params = {
+            'location': f"{lat},{lon}",
+            'apikey': self.api_key
+        }
+        if timesteps:
+            params['timesteps'] = timesteps
+
+        # aiohttp asks for gzip/deflate responses and decompresses them itself
+        data = await self._get_json(self.base_url, params)
+
+        forecast_cache.put(lat, lon, data, timesteps)
+        return data
+
+    async def _get_json(self, url, params):
+        """GET a JSON document, waiting for the host's rate limit like the blocking session does."""
+        bucket = rate_limiter.bucket(urlsplit(url).netloc)
+        attempt = 0
+        while True:
+            if bucket is not None:
+                wait = bucket.reserve()
+                record('queue', wait)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            async with self.session.get(url, params=params) as response:
+                if response.status != 429 or bucket is None:
+                    response.raise_for_status()
+                    if bucket is not None:
+                        bucket.succeeded()
+                    return await response.json(content_type=None)
+
+                bucket.throttled(parse_retry_after(response.headers.get('Retry-After')))
+                if attempt == RATE_LIMIT_RETRIES:
+                    response.raise_for_status()
+                attempt += 1
+
+    async def geocode(self, location):
+        """Get (latitude, longitude, address) for a place name, using the cache when possible."""
+        cached = geocode_cache.get(location)
+        if cached is not None:
+            return cached
+
+        if offline_geocoder is not None:
+            result = offline_geocoder.geocode(location)
+            if result[0] is not None or GEOCODER_OFFLINE_ONLY:
+                return result
+        elif GEOCODER_OFFLINE_ONLY:
+            return None, None, None
+
+        params = {
+            'q': location,
+            'format': 'json',
+            'limit': 1
+        }
+
+        places = await self._get_json(f"{self.nominatim_url}/search", params)
+
+        if not places:
+            return None, None, None
+
+        place = places[0]
+        result = (float(place['lat']), float(place['lon']), place['display_name'])
+        geocode_cache.put(location, *result, save=False)
+        # Writing the cache file blocks, so keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, geocode_cache.save)
+        return result
+
+    async def get_weather(self, location):
+        """Get weather data for a location (latitude,longitude).
+
+        Raises ValueError for a malformed location and aiohttp.ClientError
+        if the request fails.
+        """
+        lat, lon = parse_location(location)
+        data = await self.fetch_forecast(lat, lon)
+        return parse_weather(data)
+
+    async def get_weather_for_place(self, place):
+        """Geocode a place name and get its weather, returning (address, weather).
+
+        Returns (None, None) if the place could not be found.
+        """
+        lat, lon, address = await self.geocode(place)
+        if lat is None:
+            return None, None
+        data = await self.fetch_forecast(lat, lon)
+        return address, parse_weather(data)
+
+    async def get_weather_many(self, locations):
+        """Fetch many latitude,longitude locations concurrently.
+
+        Returns a list in input order holding either a weather dict or the
+        exception raised for that location.
+        """
+        return await asyncio.gather(
+            *(self.get_weather(location) for location in locations),
+            return_exceptions=True
+        )
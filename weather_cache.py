@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+from geocode_cache import normalize_query
+from json_store import JSONFile
+
+
+class ForecastCache:
+    """Bounded in-memory forecast cache with a TTL and LRU eviction.
+
+    Entries are keyed by coordinates rounded to ``precision`` decimal places,
+    so nearby lookups (e.g. 42.3478,-71.0466 and 42.3481,-71.0462 at the
+    default precision of 2) share one entry. Payloads limited to some
+    timelines (Tomorrow.io's ``timesteps``, e.g. '1m') are kept apart from
+    full ones.
+    """
+
+    def __init__(self, ttl=300, max_entries=256, precision=2, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.precision = precision
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, lat, lon, timesteps=None):
+        key = (round(float(lat), self.precision), round(float(lon), self.precision))
+        return key if timesteps is None else key + (timesteps,)
+
+    def get(self, lat, lon, timesteps=None):
+        """Return the cached payload for a location, or None if missing or expired."""
+        key = self.make_key(lat, lon, timesteps)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, data = entry
+            if self.clock() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def peek(self, lat, lon, timesteps=None):
+        """Like get(), but without counting a hit or miss or refreshing the entry's LRU position."""
+        with self._lock:
+            entry = self._entries.get(self.make_key(lat, lon, timesteps))
+        if entry is None or self.clock() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, lat, lon, data, timesteps=None):
+        """Store a payload, evicting the least recently used entries if full."""
+        key = self.make_key(lat, lon, timesteps)
+        with self._lock:
+            self._entries[key] = (self.clock(), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def age(self, lat, lon, timesteps=None):
+        """Seconds since a location's entry was stored, or None if there is none."""
+        with self._lock:
+            entry = self._entries.get(self.make_key(lat, lon, timesteps))
+        if entry is None:
+            return None
+        return self.clock() - entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def last_known_key(query):
+    """LastKnownStore key for a search: "lat,lon" rounded to 4 places for coordinates, else normalize_query()."""
+    try:
+        lat, lon = map(float, query.split(','))
+    except ValueError:
+        return normalize_query(query)
+    return f"{round(lat, 4)},{round(lon, 4)}"
+
+
+class LastKnownStore:
+    """Last successful lookup per searched place, persisted to a JSON file.
+
+    Lets the GUIs show the previous result for a place immediately (with
+    its age) while a fresh lookup runs in the background. Keys are the
+    normalized search text, so no geocoding is needed to find an entry;
+    "latitude,longitude" input is keyed by its coordinates instead, since
+    normalizing would drop the signs and decimal points.
+    """
+
+    def __init__(self, path, max_entries=100, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.clock = clock
+        self._file = JSONFile(path)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self._entries = self._file.load({})
+
+    def save(self):
+        with self._lock:
+            entries = dict(self._entries)
+        self._file.save(entries)
+
+    def get(self, query):
+        """Return (address, current values, fetched_at) for a place, or None."""
+        with self._lock:
+            entry = self._entries.get(last_known_key(query))
+        if entry is None:
+            return None
+        return entry['address'], entry['current'], entry['fetched_at']
+
+    def put(self, query, address, current, age=0.0):
+        """Remember a result that was fetched ``age`` seconds ago; returns its fetched_at."""
+        fetched_at = self.clock() - age
+        with self._lock:
+            self._entries[last_known_key(query)] = {
+                'address': address,
+                'current': current,
+                'fetched_at': fetched_at
+            }
+            if len(self._entries) > self.max_entries:
+                # Forget the places that were looked up longest ago
+                by_age = sorted(self._entries, key=lambda key: self._entries[key]['fetched_at'])
+                for key in by_age[:len(self._entries) - self.max_entries]:
+                    del self._entries[key]
+        self.save()
+        return fetched_at
+
+    def age(self, fetched_at):
+        return max(self.clock() - fetched_at, 0)
+
+    def items(self):
+        """(key, address, fetched_at) for every remembered place; see last_known_key()."""
+        with self._lock:
+            return [(query, entry['address'], entry['fetched_at']) for query, entry in self._entries.items()]
+
+
+def format_age(seconds):
+    """Describe how old some data is, e.g. "just now" or "5 min ago"."""
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h ago"
+    days = int(seconds // 86400)
+    return f"{days} day{'s' if days != 1 else ''} ago"
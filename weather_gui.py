@@ -1,20 +1,16 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import requests
+from tkinter import ttk
 from dotenv import load_dotenv
-import os
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+
+from gui_worker import GuiWorker, WeatherLookup, get_executor
+from weather_api import get_weather_description, warm_up
+from refresh_scheduler import RefreshScheduler, load_saved_locations
+from suggestion_box import SuggestionBox
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment variable
-API_KEY = os.getenv('TOMORROW_API_KEY')
-BASE_URL = "https://api.tomorrow.io/v4/weather/forecast"
-
-class WeatherApp:
+class WeatherApp(WeatherLookup):
     def __init__(self, root):
         self.root = root
         self.root.title("Weather App")
@@ -77,83 +73,65 @@ class WeatherApp:
         self.cloud_label = ttk.Label(self.results_frame, text="")
         self.cloud_label.grid(row=6, column=0, sticky=tk.W)
         
+        # Background lookups; the newest search always wins
+        self.in_flight_var = tk.StringVar(value="")
+        ttk.Label(self.results_frame, textvariable=self.in_flight_var).grid(row=7, column=0, sticky=tk.W, pady=(10, 0))
+        self.worker = GuiWorker(self.root, on_in_flight_change=self.update_in_flight)
+        
+        # Places matching what is typed, from the search history and caches
+        self.suggestion_box = SuggestionBox(self.root, self.location_entry, self.worker, self.pick_suggestion)
+        
+        # Keep saved locations warm so searching for them is instant
+        self.scheduler = RefreshScheduler(load_saved_locations())
+        if self.scheduler.locations:
+            self.scheduler.start()
+        
+        # Load the network libraries in the background once the window is up
+        self.root.after(200, lambda: get_executor().submit(warm_up))
+        
+        # How old the displayed values are; a cached result is shown while it revalidates
+        self.shown = None
+        self.age_var = tk.StringVar(value="")
+        self.watch_visibility()
+        ttk.Label(self.results_frame, textvariable=self.age_var).grid(row=8, column=0, sticky=tk.W)
+        
+        # Where the time went in the last lookup
+        self.timings_var = tk.StringVar(value="")
+        ttk.Label(self.results_frame, textvariable=self.timings_var).grid(row=9, column=0, sticky=tk.W)
+        
         # Bind Enter key to search
-        self.location_entry.bind('<Return>', lambda e: self.get_weather())
-
-    def get_coordinates(self, location):
-        """Get coordinates for a location using geopy."""
-        try:
-            geolocator = Nominatim(user_agent="weather_app")
-            location_data = geolocator.geocode(location)
-            if location_data:
-                return location_data.latitude, location_data.longitude, location_data.address
-            return None, None, None
-        except GeocoderTimedOut:
-            messagebox.showerror("Error", "Geocoding service timed out. Please try again.")
-            return None, None, None
+        self.location_entry.bind('<Return>', lambda e: self.get_weather(), add='+')
 
     def get_weather_description(self, conditions):
         """Generate a weather description based on conditions."""
-        if conditions['precipitationProbability'] > 50:
-            if conditions['temperature'] <= 0:
-                return "Snowy"
-            return "Rainy"
-        elif conditions['cloudCover'] > 70:
-            return "Cloudy"
-        elif conditions['cloudCover'] > 30:
-            return "Partly cloudy"
-        else:
-            return "Clear"
+        return get_weather_description(conditions)
 
-    def get_weather(self):
-        """Get weather data and update the UI."""
-        location = self.location_entry.get().strip()
-        if not location:
-            messagebox.showwarning("Warning", "Please enter a location")
-            return
-            
-        # Get coordinates
-        lat, lon, address = self.get_coordinates(location)
-        if not lat or not lon:
-            messagebox.showerror("Error", "Location not found")
+    def show_weather(self, current, address, fetched_at):
+        self.fetched_at = fetched_at
+        self.update_age_label()
+        
+        # Nothing to redraw when a revalidation returns the values already shown
+        if self.shown == (current, address, self.temp_unit.get()):
             return
-            
-        # Prepare API request
-        params = {
-            'location': f"{lat},{lon}",
-            'apikey': API_KEY
-        }
-        
-        try:
-            response = requests.get(BASE_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract current conditions
-            current = data['timelines']['minutely'][0]['values']
-            
-            # Update UI with weather data
-            self.location_label.config(text=f"Weather for {address}")
-            
-            # Temperature
-            temp = current['temperature']
-            if self.temp_unit.get() == "F":
-                temp = (temp * 9/5) + 32
-                unit = "°F"
-            else:
-                unit = "°C"
-            
-            self.temp_label.config(text=f"Temperature: {temp:.1f}{unit}")
-            self.conditions_label.config(text=f"Conditions: {self.get_weather_description(current)}")
-            self.humidity_label.config(text=f"Humidity: {current['humidity']:.1f}%")
-            self.wind_label.config(text=f"Wind Speed: {current['windSpeed']:.1f} m/s")
-            self.precip_label.config(text=f"Precipitation Probability: {current['precipitationProbability']:.1f}%")
-            self.cloud_label.config(text=f"Cloud Cover: {current['cloudCover']:.1f}%")
-            
-        except requests.exceptions.RequestException as e:
-            messagebox.showerror("Error", f"Error fetching weather data: {str(e)}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.shown = (current, address, self.temp_unit.get())
+        
+        # Update UI with weather data
+        self.location_label.config(text=f"Weather for {address}")
+        
+        # Temperature
+        temp = current['temperature']
+        if self.temp_unit.get() == "F":
+            temp = (temp * 9/5) + 32
+            unit = "°F"
+        else:
+            unit = "°C"
+        
+        self.temp_label.config(text=f"Temperature: {temp:.1f}{unit}")
+        self.conditions_label.config(text=f"Conditions: {self.get_weather_description(current)}")
+        self.humidity_label.config(text=f"Humidity: {current['humidity']:.1f}%")
+        self.wind_label.config(text=f"Wind Speed: {current['windSpeed']:.1f} m/s")
+        self.precip_label.config(text=f"Precipitation Probability: {current['precipitationProbability']:.1f}%")
+        self.cloud_label.config(text=f"Cloud Cover: {current['cloudCover']:.1f}%")
 
 def main():
     root = tk.Tk()
@@ -1,25 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import requests
 from dotenv import load_dotenv
-import os
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
-from PIL import Image, ImageTk
-import json
-import base64
-import geocoder
-import time
-import threading
+
+from gui_worker import GuiWorker, LookupFailed, WeatherLookup, error_message, get_executor
+from animation import AnimationDriver, Tween, color_ramp, ramp_color
+from weather_api import reverse_geocode, get_weather_description, warm_up
+from refresh_scheduler import RefreshScheduler, load_saved_locations
+from suggestion_box import SuggestionBox
+from http_session import get_session, REQUEST_TIMEOUT
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment variable
-API_KEY = os.getenv('TOMORROW_API_KEY')
-BASE_URL = "https://api.tomorrow.io/v4/weather/forecast"
-
 # Define color scheme
 COLORS = {
     'bg': '#f0f2f5',           # Light gray background
@@ -32,32 +24,38 @@ COLORS = {
 }
 
 class AnimatedLabel(ttk.Label):
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, color=COLORS['text'], hidden_color=COLORS['bg'], **kwargs):
         super().__init__(master, **kwargs)
         self._alpha = 0
         self.fade_speed = 0.1
+        # Fades blend between the background and the text color
+        self.ramp = color_ramp(hidden_color, color)
+        self._color = None
+        
+    def fade_in(self, on_done=None):
+        self.fade_to(1, on_done)
+        
+    def fade_out(self, on_done=None):
+        self.fade_to(0, on_done)
+        
+    def fade_to(self, target, on_done=None):
+        """Fade towards an alpha, replacing any fade already running on this label."""
+        start = self._alpha
+        # fade_speed is the alpha change per 50 ms frame of the old per-label loops
+        duration = abs(target - start) / self.fade_speed * 50
+        
+        def frame(progress):
+            self._alpha = start + (target - start) * progress
+            color = self.calculate_color()
+            # Neighbouring frames often land on the same ramp entry
+            if color != self._color:
+                self._color = color
+                self.configure(foreground=color)
         
-    def fade_in(self):
-        def fade():
-            if self._alpha < 1:
-                self._alpha += self.fade_speed
-                self.configure(foreground=self.calculate_color())
-                self.after(50, fade)
-        fade()
-        
-    def fade_out(self):
-        def fade():
-            if self._alpha > 0:
-                self._alpha -= self.fade_speed
-                self.configure(foreground=self.calculate_color())
-                self.after(50, fade)
-        fade()
+        AnimationDriver.for_widget(self).start(self, 'alpha', Tween(duration, frame, on_done))
         
     def calculate_color(self):
-        r = int(int(COLORS['text'][1:3], 16) * self._alpha)
-        g = int(int(COLORS['text'][3:5], 16) * self._alpha)
-        b = int(int(COLORS['text'][5:7], 16) * self._alpha)
-        return f'#{r:02x}{g:02x}{b:02x}'
+        return ramp_color(self.ramp, self._alpha)
 
 class PulsingButton(tk.Button):
     def __init__(self, master, **kwargs):
@@ -68,19 +66,19 @@ class PulsingButton(tk.Button):
     def start_pulse(self):
         if not self.pulsing:
             self.pulsing = True
-            self._pulse_animation()
+            AnimationDriver.for_widget(self).start(self, 'pulse', Tween(None, self._pulse_animation))
             
     def stop_pulse(self):
         self.pulsing = False
+        AnimationDriver.for_widget(self).cancel(self, 'pulse')
         self.configure(pady=8)
         
-    def _pulse_animation(self):
-        if not self.pulsing:
-            return
-            
-        self.pulse_size = (self.pulse_size + 1) % 4
-        self.configure(pady=8 + self.pulse_size)
-        self.after(100, self._pulse_animation)
+    def _pulse_animation(self, elapsed):
+        # Grow by one pixel every 100 ms, cycling through 4 sizes
+        pulse_size = int(elapsed // 100 + 1) % 4
+        if pulse_size != self.pulse_size:
+            self.pulse_size = pulse_size
+            self.configure(pady=8 + self.pulse_size)
 
 class ModernButton(PulsingButton):
     def __init__(self, master, **kwargs):
@@ -113,7 +111,7 @@ class ModernEntry(ttk.Entry):
             font=('Segoe UI', 11)
         )
 
-class WeatherApp:
+class WeatherApp(WeatherLookup):
     def __init__(self, root):
         self.root = root
         self.root.title("Modern Weather App")
@@ -138,7 +136,16 @@ class WeatherApp:
             'Snowy': ['🌨️', '❄️']
         }
         self.current_icon_index = 0
-        self.animate_icons()
+        
+        # Icons only animate while a condition is shown and the window is visible
+        self.current_condition = None
+        self.icon_after_id = None
+        self.watch_visibility()
+        
+        # Text last put in each value label, so refreshes only touch what changed
+        self.displayed = {}
+        self.label_updates = 0
+        self.last_refresh_updates = 0
         
         # Create loading indicator
         self.loading_var = tk.StringVar(value="")
@@ -148,18 +155,72 @@ class WeatherApp:
             style='Loading.TLabel'
         )
         self.loading_label.grid(row=1, column=0, columnspan=2, pady=20)
+        
+        # Background lookups; the newest search always wins
+        self.in_flight_var = tk.StringVar(value="")
+        ttk.Label(
+            self.results_frame,
+            textvariable=self.in_flight_var,
+            style='Status.TLabel'
+        ).grid(row=3, column=0, columnspan=2, pady=(10, 0))
+        self.worker = GuiWorker(self.root, on_in_flight_change=self.update_in_flight)
+        
+        # Places matching what is typed, from the search history and caches
+        self.suggestion_box = SuggestionBox(self.root, self.location_entry, self.worker, self.pick_suggestion, font=('Segoe UI', 11))
+        
+        # Keep saved locations warm so searching for them is instant
+        self.scheduler = RefreshScheduler(load_saved_locations())
+        if self.scheduler.locations:
+            self.scheduler.start()
+        
+        # Load the network libraries in the background once the window is up
+        self.root.after(200, lambda: get_executor().submit(warm_up))
+        
+        # How old the displayed values are; a cached result is shown while it revalidates
+        self.age_var = tk.StringVar(value="")
+        ttk.Label(
+            self.results_frame,
+            textvariable=self.age_var,
+            style='Status.TLabel'
+        ).grid(row=4, column=0, columnspan=2)
+        
+        # Where the time went in the last lookup
+        self.timings_var = tk.StringVar(value="")
+        ttk.Label(
+            self.results_frame,
+            textvariable=self.timings_var,
+            style='Status.TLabel'
+        ).grid(row=5, column=0, columnspan=2)
 
     def animate_icons(self):
-        if hasattr(self, 'weather_labels') and 'conditions' in self.weather_labels:
-            label = self.weather_labels['conditions']
-            text = label.cget('text')
-            for condition, icons in self.weather_icons.items():
-                if condition in text:
-                    self.current_icon_index = (self.current_icon_index + 1) % len(icons)
-                    new_text = f"{condition} {icons[self.current_icon_index]}"
-                    label.config(text=new_text)
-                    break
-        self.root.after(1000, self.animate_icons)
+        self.icon_after_id = None
+        icons = self.weather_icons.get(self.current_condition)
+        if not icons:
+            return
+        
+        self.current_icon_index = (self.current_icon_index + 1) % len(icons)
+        new_text = f"{self.current_condition} {icons[self.current_icon_index]}"
+        self.weather_labels['conditions'].config(text=new_text)
+        self.start_icon_animation()
+
+    def start_icon_animation(self):
+        if self.icon_after_id is None and self.current_condition and self.window_visible:
+            self.icon_after_id = self.root.after(1000, self.animate_icons)
+
+    def stop_icon_animation(self):
+        if self.icon_after_id is not None:
+            self.root.after_cancel(self.icon_after_id)
+            self.icon_after_id = None
+
+    def on_map(self, event):
+        super().on_map(event)
+        if event.widget is self.root:
+            self.start_icon_animation()
+
+    def on_unmap(self, event):
+        super().on_unmap(event)
+        if event.widget is self.root:
+            self.stop_icon_animation()
 
     def configure_styles(self):
         style = ttk.Style()
@@ -183,6 +244,11 @@ class WeatherApp:
                        foreground=COLORS['accent'],
                        font=('Segoe UI', 12, 'italic'))
         
+        style.configure('Status.TLabel',
+                       background=COLORS['bg'],
+                       foreground=COLORS['accent'],
+                       font=('Segoe UI', 9))
+        
         style.configure('Weather.TFrame', background=COLORS['bg'])
         
         style.configure('Search.TEntry',
@@ -217,7 +283,7 @@ class WeatherApp:
             style='Search.TEntry'
         )
         self.location_entry.grid(row=0, column=0, padx=(0, 10))
-        self.location_entry.bind('<Return>', lambda e: self.get_weather())
+        self.location_entry.bind('<Return>', lambda e: self.get_weather(), add='+')
         
         # Search button
         self.search_button = ModernButton(
@@ -318,39 +384,41 @@ class WeatherApp:
         self.location_button.start_pulse()
         self.loading_var.set("Getting your location...")
         self.loading_label.fade_in()
-        
-        def fetch_location():
-            try:
-                g = geocoder.ip('me')
-                if g.ok:
-                    self.root.after(0, self.handle_location_result, g)
-                else:
-                    self.root.after(0, self.handle_location_error)
-            except Exception as e:
-                self.root.after(0, self.handle_location_error, str(e))
-        
-        threading.Thread(target=fetch_location, daemon=True).start()
+        self.worker.submit(
+            'location', self.fetch_location,
+            on_success=self.handle_location_result,
+            on_error=self.handle_location_error
+        )
 
-    def handle_location_result(self, g):
+    def fetch_location(self):
+        """Detect the user's city from their IP address (runs on a worker thread)."""
+        import geocoder
+        g = geocoder.ip('me', session=get_session(), timeout=REQUEST_TIMEOUT)
+        if not g.ok:
+            raise LookupFailed("Could not detect location")
+        # Fall back to the nearest known place when the IP lookup has no city
+        return g.city or reverse_geocode(*g.latlng)[2]
+
+    def handle_location_result(self, place):
         self.location_button.stop_pulse()
         self.loading_var.set("")
         self.loading_label.fade_out()
         self.location_entry.delete(0, tk.END)
-        self.location_entry.insert(0, g.city)
+        self.location_entry.insert(0, place)
         self.get_weather()
 
-    def handle_location_error(self, error="Could not detect location"):
+    def handle_location_error(self, error):
         self.location_button.stop_pulse()
         self.loading_var.set("")
         self.loading_label.fade_out()
-        messagebox.showerror("Error", str(error))
+        messagebox.showerror("Error", error_message(error))
 
     def update_temperature(self):
         if hasattr(self, 'current_weather'):
             self.update_weather_labels(self.current_weather)
 
-    def update_weather_labels(self, weather_data):
-        self.current_weather = weather_data
+    def build_display(self, weather_data):
+        """Compute the text for every value label from raw weather values."""
         temp = weather_data['temperature']
         if self.temp_unit.get() == "F":
             temp = (temp * 9/5) + 32
@@ -361,7 +429,7 @@ class WeatherApp:
         conditions = self.get_weather_description(weather_data)
         icon = self.weather_icons.get(conditions, [''])[0]
         
-        updates = {
+        return conditions, {
             'temp': f"{temp:.1f}{unit}",
             'conditions': f"{conditions} {icon}",
             'humidity': f"{weather_data['humidity']:.1f}%",
@@ -369,99 +437,59 @@ class WeatherApp:
             'precip': f"{weather_data['precipitationProbability']:.1f}%",
             'cloud': f"{weather_data['cloudCover']:.1f}%"
         }
+
+    def update_weather_labels(self, weather_data):
+        self.current_weather = weather_data
+        conditions, updates = self.build_display(weather_data)
         
-        for key, value in updates.items():
-            self.weather_labels[key].fade_out()
-            self.weather_labels[key].after(300, lambda k=key, v=value: self.update_label(k, v))
+        if conditions != self.current_condition:
+            # Restart the icon animation once the new condition is on screen
+            self.stop_icon_animation()
+            self.current_condition = conditions
+            self.current_icon_index = 0
+        
+        # Only fade the labels whose text actually changed
+        changed = {key: value for key, value in updates.items() if self.displayed.get(key) != value}
+        self.displayed.update(changed)
+        self.last_refresh_updates = len(changed)
+        
+        for key, value in changed.items():
+            self.weather_labels[key].fade_out(on_done=lambda k=key, v=value: self.update_label(k, v))
 
     def update_label(self, key, value):
+        self.label_updates += 1
         self.weather_labels[key].configure(text=value)
         self.weather_labels[key].fade_in()
-
-    def get_coordinates(self, location):
-        """Get coordinates for a location using geopy."""
-        try:
-            geolocator = Nominatim(user_agent="weather_app")
-            location_data = geolocator.geocode(location)
-            if location_data:
-                return location_data.latitude, location_data.longitude, location_data.address
-            return None, None, None
-        except GeocoderTimedOut:
-            messagebox.showerror("Error", "Geocoding service timed out. Please try again.")
-            return None, None, None
+        if key == 'conditions':
+            self.start_icon_animation()
 
     def get_weather_description(self, conditions):
         """Generate a weather description based on conditions."""
-        if conditions['precipitationProbability'] > 50:
-            if conditions['temperature'] <= 0:
-                return "Snowy"
-            return "Rainy"
-        elif conditions['cloudCover'] > 70:
-            return "Cloudy"
-        elif conditions['cloudCover'] > 30:
-            return "Partly cloudy"
-        else:
-            return "Clear"
+        return get_weather_description(conditions)
 
-    def get_weather(self):
-        """Get weather data and update the UI."""
-        location = self.location_entry.get().strip()
-        if not location:
-            messagebox.showwarning("Warning", "Please enter a location")
-            return
-        
-        # Show loading indicator
-        self.loading_var.set("Fetching weather data...")
+    def lookup_started(self, refreshing):
+        self.loading_var.set("Refreshing..." if refreshing else "Fetching weather data...")
         self.loading_label.fade_in()
         self.search_button.start_pulse()
-        
-        def fetch_weather():
-            try:
-                # Get coordinates
-                lat, lon, address = self.get_coordinates(location)
-                if not lat or not lon:
-                    self.root.after(0, self.handle_weather_error, "Location not found")
-                    return
-                
-                # Prepare API request
-                params = {
-                    'location': f"{lat},{lon}",
-                    'apikey': API_KEY
-                }
-                
-                response = requests.get(BASE_URL, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Extract current conditions
-                current = data['timelines']['minutely'][0]['values']
-                
-                # Update UI with weather data
-                self.root.after(0, self.handle_weather_success, current, address)
-                
-            except requests.exceptions.RequestException as e:
-                self.root.after(0, self.handle_weather_error, f"Error fetching weather data: {str(e)}")
-            except Exception as e:
-                self.root.after(0, self.handle_weather_error, f"An error occurred: {str(e)}")
-        
-        threading.Thread(target=fetch_weather, daemon=True).start()
-
-    def handle_weather_success(self, current, address):
+
+    def lookup_finished(self):
         self.search_button.stop_pulse()
         self.loading_var.set("")
         self.loading_label.fade_out()
-        
-        self.location_label.fade_out()
-        self.location_label.after(300, lambda: self.location_label.configure(text=address))
-        self.location_label.after(300, self.location_label.fade_in)
+
+    def show_weather(self, current, address, fetched_at):
+        # Labels are diffed, so a revalidation that changed nothing redraws nothing
+        self.fetched_at = fetched_at
+        self.update_age_label()
+        if self.displayed.get('location') != address:
+            self.displayed['location'] = address
+            self.location_label.fade_out(on_done=lambda: self.update_location_label(address))
         
         self.update_weather_labels(current)
 
-    def handle_weather_error(self, error_message):
-        self.search_button.stop_pulse()
-        self.loading_var.set("")
-        self.loading_label.fade_out()
-        messagebox.showerror("Error", error_message)
+    def update_location_label(self, address):
+        self.location_label.configure(text=address)
+        self.location_label.fade_in()
 
 def main():
     root = tk.Tk()
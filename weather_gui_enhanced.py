@@ -1,22 +1,15 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import requests
+from tkinter import ttk
 from dotenv import load_dotenv
-import os
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
-from PIL import Image, ImageTk
-import json
-import base64
+
+from gui_worker import GuiWorker, WeatherLookup, get_executor
+from weather_api import get_weather_description, warm_up
+from refresh_scheduler import RefreshScheduler, load_saved_locations
+from suggestion_box import SuggestionBox
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment variable
-API_KEY = os.getenv('TOMORROW_API_KEY')
-BASE_URL = "https://api.tomorrow.io/v4/weather/forecast"
-
 # Define color scheme
 COLORS = {
     'bg': '#1e1e2e',
@@ -57,7 +50,7 @@ class ModernEntry(ttk.Entry):
             font=('Segoe UI', 11)
         )
 
-class WeatherApp:
+class WeatherApp(WeatherLookup):
     def __init__(self, root):
         self.root = root
         self.root.title("Modern Weather App")
@@ -82,6 +75,11 @@ class WeatherApp:
             'Snowy': '🌨️'
         }
         
+        # Text last put in each value label, so refreshes only touch what changed
+        self.displayed = {}
+        self.label_updates = 0
+        self.last_refresh_updates = 0
+        
         # Create loading indicator
         self.loading_var = tk.StringVar(value="")
         self.loading_label = ttk.Label(
@@ -90,6 +88,43 @@ class WeatherApp:
             style='Loading.TLabel'
         )
         self.loading_label.grid(row=1, column=0, columnspan=2, pady=20)
+        
+        # Background lookups; the newest search always wins
+        self.in_flight_var = tk.StringVar(value="")
+        ttk.Label(
+            self.results_frame,
+            textvariable=self.in_flight_var,
+            style='Status.TLabel'
+        ).grid(row=3, column=0, columnspan=2, pady=(10, 0))
+        self.worker = GuiWorker(self.root, on_in_flight_change=self.update_in_flight)
+        
+        # Places matching what is typed, from the search history and caches
+        self.suggestion_box = SuggestionBox(self.root, self.location_entry, self.worker, self.pick_suggestion, font=('Segoe UI', 11))
+        
+        # Keep saved locations warm so searching for them is instant
+        self.scheduler = RefreshScheduler(load_saved_locations())
+        if self.scheduler.locations:
+            self.scheduler.start()
+        
+        # Load the network libraries in the background once the window is up
+        self.root.after(200, lambda: get_executor().submit(warm_up))
+        
+        # How old the displayed values are; a cached result is shown while it revalidates
+        self.age_var = tk.StringVar(value="")
+        self.watch_visibility()
+        ttk.Label(
+            self.results_frame,
+            textvariable=self.age_var,
+            style='Status.TLabel'
+        ).grid(row=4, column=0, columnspan=2)
+        
+        # Where the time went in the last lookup
+        self.timings_var = tk.StringVar(value="")
+        ttk.Label(
+            self.results_frame,
+            textvariable=self.timings_var,
+            style='Status.TLabel'
+        ).grid(row=5, column=0, columnspan=2)
 
     def configure_styles(self):
         style = ttk.Style()
@@ -113,6 +148,11 @@ class WeatherApp:
                        foreground=COLORS['accent'],
                        font=('Segoe UI', 12, 'italic'))
         
+        style.configure('Status.TLabel',
+                       background=COLORS['bg'],
+                       foreground=COLORS['accent'],
+                       font=('Segoe UI', 9))
+        
         style.configure('Weather.TFrame', background=COLORS['bg'])
         
         # Configure custom entry style
@@ -146,7 +186,7 @@ class WeatherApp:
             style='Search.TEntry'
         )
         self.location_entry.grid(row=0, column=0, padx=(0, 10))
-        self.location_entry.bind('<Return>', lambda e: self.get_weather())
+        self.location_entry.bind('<Return>', lambda e: self.get_weather(), add='+')
         
         # Search button
         self.search_button = ModernButton(
@@ -173,7 +213,8 @@ class WeatherApp:
             text="°C",
             variable=self.temp_unit,
             value="C",
-            style='Unit.TRadiobutton'
+            style='Unit.TRadiobutton',
+            command=self.update_temperature
         ).pack(side=tk.LEFT, padx=5)
         
         ttk.Radiobutton(
@@ -181,7 +222,8 @@ class WeatherApp:
             text="°F",
             variable=self.temp_unit,
             value="F",
-            style='Unit.TRadiobutton'
+            style='Unit.TRadiobutton',
+            command=self.update_temperature
         ).pack(side=tk.LEFT, padx=5)
 
     def create_results_frame(self):
@@ -231,7 +273,13 @@ class WeatherApp:
         
         self.weather_labels[key] = value_label
 
+    def update_temperature(self):
+        # Re-render from the last raw values, no re-fetch needed
+        if hasattr(self, 'current_weather'):
+            self.update_weather_labels(self.current_weather)
+
     def update_weather_labels(self, weather_data):
+        self.current_weather = weather_data
         temp = weather_data['temperature']
         if self.temp_unit.get() == "F":
             temp = (temp * 9/5) + 32
@@ -251,79 +299,33 @@ class WeatherApp:
             'cloud': f"{weather_data['cloudCover']:.1f}%"
         }
         
-        for key, value in updates.items():
+        # Only reconfigure the labels whose text actually changed
+        changed = {key: value for key, value in updates.items() if self.displayed.get(key) != value}
+        self.displayed.update(changed)
+        self.last_refresh_updates = len(changed)
+        self.label_updates += len(changed)
+        
+        for key, value in changed.items():
             self.weather_labels[key].config(text=value)
 
-    def get_coordinates(self, location):
-        """Get coordinates for a location using geopy."""
-        try:
-            geolocator = Nominatim(user_agent="weather_app")
-            location_data = geolocator.geocode(location)
-            if location_data:
-                return location_data.latitude, location_data.longitude, location_data.address
-            return None, None, None
-        except GeocoderTimedOut:
-            messagebox.showerror("Error", "Geocoding service timed out. Please try again.")
-            return None, None, None
-
     def get_weather_description(self, conditions):
         """Generate a weather description based on conditions."""
-        if conditions['precipitationProbability'] > 50:
-            if conditions['temperature'] <= 0:
-                return "Snowy"
-            return "Rainy"
-        elif conditions['cloudCover'] > 70:
-            return "Cloudy"
-        elif conditions['cloudCover'] > 30:
-            return "Partly cloudy"
-        else:
-            return "Clear"
+        return get_weather_description(conditions)
+
+    def lookup_started(self, refreshing):
+        self.loading_var.set("Refreshing..." if refreshing else "Fetching weather data...")
+
+    def lookup_finished(self):
+        self.loading_var.set("")
 
-    def get_weather(self):
-        """Get weather data and update the UI."""
-        location = self.location_entry.get().strip()
-        if not location:
-            messagebox.showwarning("Warning", "Please enter a location")
-            return
-        
-        # Show loading indicator
-        self.loading_var.set("Fetching weather data...")
-        self.root.update()
-        
-        try:
-            # Get coordinates
-            lat, lon, address = self.get_coordinates(location)
-            if not lat or not lon:
-                self.loading_var.set("")
-                messagebox.showerror("Error", "Location not found")
-                return
-            
-            # Prepare API request
-            params = {
-                'location': f"{lat},{lon}",
-                'apikey': API_KEY
-            }
-            
-            response = requests.get(BASE_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract current conditions
-            current = data['timelines']['minutely'][0]['values']
-            
-            # Update UI with weather data
+    def show_weather(self, current, address, fetched_at):
+        # Labels are diffed, so a revalidation that changed nothing redraws nothing
+        self.fetched_at = fetched_at
+        self.update_age_label()
+        if self.displayed.get('location') != address:
+            self.displayed['location'] = address
             self.location_label.config(text=address)
-            self.update_weather_labels(current)
-            
-            # Clear loading indicator
-            self.loading_var.set("")
-            
-        except requests.exceptions.RequestException as e:
-            self.loading_var.set("")
-            messagebox.showerror("Error", f"Error fetching weather data: {str(e)}")
-        except Exception as e:
-            self.loading_var.set("")
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        self.update_weather_labels(current)
 
 def main():
     root = tk.Tk()